@@ -1,6 +1,6 @@
 from components import App
 
-app = App()
+app = App(warmup=True, admission=True)
 server = app.app.server
 
 if __name__ == '__main__':
@@ -0,0 +1,288 @@
+"""
+Assembly scaling benchmarks of the component framework. Synthetic project trees with a growing number of dashboards,
+windows and filters are generated and the startup stages are measured through the real components: the execution of
+the dashboard modules (Dashboard construction and the add_* calls), update_dashboard, Structure._collect_callbacks
+(Callback construction and registration) and the serialization of the layout and of the dashboard pages the way Dash
+sends them. Results (time and peak memory) are written into a JSON file with a scaling report (the exponent of the
+time of every stage against the number of windows, 1 is linear) and optionally compared with a stored baseline.
+
+    python -m benchmarks.assembly --dashboards 1 10 100 --windows 1 10 50 --filters 10
+    python -m benchmarks.assembly --dashboards 1 10 100 500 --max-windows 25000 --save-baseline
+    python -m benchmarks.assembly --baseline benchmarks/results/assembly-baseline.json
+"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from importlib import import_module
+from importlib.util import spec_from_file_location, module_from_spec
+from os import makedirs
+from os.path import dirname, join
+from tempfile import TemporaryDirectory
+import numpy as np
+import pandas as pd
+import dash
+from dash import _callback
+from dash._utils import to_json
+from components import Structure
+from components.project import lazy_loading
+from .pipeline import RESULTS_DIR, measure
+
+PROJECT_ID = 'bench'
+
+PROJECT_MODULE = """from components import Project
+project = Project()
+"""
+
+DATASOURCES_MODULE = """from components import DataSource
+
+facts = DataSource(
+    'Facts.csv', sep=';', filter_columns={filter_columns},
+    set_date_columns={{'Date': '%d.%m.%Y'}}, data_dir={data_dir!r}
+)
+"""
+
+# Laid out like the project dashboards: datasources imported from the project directory, filters, windows on a grid
+# of four columns and a callback per window
+DASHBOARD_MODULE = """import sys
+import os
+import inspect
+sys.path.insert(1, os.path.dirname(os.path.split(inspect.stack()[0][1])[0]))
+from datasources import facts
+
+from components import Dashboard
+
+
+dashboard = Dashboard(datasource_objs=[facts], overview_text='Synthetic dashboard')
+
+dashboard.add_filter(datasource_id='Facts', source_column='Date', filter_type='daterange')
+for i in range(1, {filters} + 1):
+    dashboard.add_filter(datasource_id='Facts', source_column=f'Category_{{i}}')
+
+
+def figure(filterpanel_values):
+    return {{}}
+
+
+for window_id in range(1, {windows} + 1):
+    row, col = divmod(window_id - 1, 4)
+    dashboard.add_window(
+        window_id=window_id,
+        name=f'Window {{window_id}}',
+        row_start=row + 1,
+        row_end=row + 1,
+        col_start=col + 1,
+        col_end=col + 2,
+        layout={{}},
+        table_feature=window_id % 5 == 0,
+        info=f'Window {{window_id}} of the synthetic dashboard',
+    )
+    dashboard.set_callback(
+        outputs={{window_id: ['graph.figure']}},
+        inputs={{window_id: ['filterpanel_values_store.data']}},
+        func=figure
+    )
+"""
+
+
+def write_facts(directory: str, n_filters: int, n_rows: int = 200, n_values: int = 10) -> None:
+    """ Small dataset, the data reads aren't part of the assembly """
+    rng = np.random.default_rng(0)
+    dataframe = pd.DataFrame({
+        'Date': pd.date_range('2020-01-01', periods=n_rows, freq='D').strftime('%d.%m.%Y'),
+        'Value': rng.normal(size=n_rows).round(2),
+        **{f'Category_{i}': rng.integers(n_values, size=n_rows).astype(str) for i in range(1, n_filters + 1)},
+    })
+    dataframe.to_csv(join(directory, 'Facts.csv'), sep=';', index=False)
+
+
+def write_project(directory: str, data_dir: str, n_dashboards: int, n_windows: int, n_filters: int) -> str:
+    """ Writes the project tree and returns the project directory """
+    project_dir = join(directory, PROJECT_ID)
+    makedirs(join(project_dir, 'dashboards'))
+    filter_columns = {'Date': 'minmax', **{f'Category_{i}': 'unique' for i in range(1, n_filters + 1)}}
+    with open(join(project_dir, 'project.py'), 'w') as f:
+        f.write(PROJECT_MODULE)
+    with open(join(project_dir, 'datasources.py'), 'w') as f:
+        f.write(DATASOURCES_MODULE.format(filter_columns=filter_columns, data_dir=data_dir))
+    for i in range(1, n_dashboards + 1):
+        with open(join(project_dir, 'dashboards', f'dashboard_{i:04d}.py'), 'w') as f:
+            f.write(DASHBOARD_MODULE.format(windows=n_windows, filters=n_filters))
+    return project_dir
+
+
+def load_project(project_dir: str):
+    """ Project object without the dashboards, they are loaded by the measured stages """
+    token = lazy_loading.set(True)
+    try:
+        spec = spec_from_file_location(f'{PROJECT_ID}_project', join(project_dir, 'project.py'))
+        module = module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        lazy_loading.reset(token)
+    return module.project
+
+
+def exec_dashboards(project_obj) -> list:
+    dashboard_objs = []
+    for dashboard_name in project_obj.dashboards_to_get:
+        spec = spec_from_file_location(project_obj._module_name(dashboard_name),
+                                       join(project_obj.dashboards_path, dashboard_name + '.py'))
+        module = module_from_spec(spec)
+        spec.loader.exec_module(module)
+        dashboard_objs.append(module.dashboard)
+    return dashboard_objs
+
+
+def clear_registered_callbacks() -> None:
+    """ The callbacks registered with dash.callback aren't moved into any app here """
+    _callback.GLOBAL_CALLBACK_MAP.clear()
+    _callback.GLOBAL_CALLBACK_LIST.clear()
+    _callback.GLOBAL_INLINE_SCRIPTS.clear()
+
+
+def serialize(structure_obj) -> int:
+    """ The app layout and the pages of all dashboards as Dash sends them, returns the payload size """
+    pages = [
+        [dashboard_obj.overview_modal, dashboard_obj.dashboard_div, dashboard_obj.filterpanel_comp]
+        for dashboard_obj in structure_obj.dashboards.values()
+    ]
+    return len(to_json(structure_obj.layout)) + sum(len(to_json(page)) for page in pages)
+
+
+def run_case(directory: str, data_dir: str, n_dashboards: int, n_windows: int, n_filters: int,
+             repeat: int) -> list:
+    case = {'dashboards': n_dashboards, 'windows': n_windows, 'filters': n_filters}
+    results = []
+
+    def record(stage, func):
+        result, seconds, peak = measure(func, repeat)
+        results.append({'stage': stage, **case, 'seconds': seconds, 'peak_bytes': peak})
+        print(f"{stage:<22} dashboards={n_dashboards:<5} windows={n_windows:<4} filters={n_filters:<4} "
+              f"{seconds * 1000:10.1f} ms {peak / 2 ** 20:10.1f} MiB")
+        return result
+
+    project_dir = write_project(join(directory, f'{n_dashboards}-{n_windows}-{n_filters}'), data_dir,
+                                n_dashboards, n_windows, n_filters)
+    path = list(sys.path)
+    sys.modules.pop('datasources', None)
+    sys.path.insert(1, project_dir)
+    try:
+        # The datasource is loaded once before the measured stages like the dashboard imports after the first one
+        import_module('datasources').facts.columns_config
+        project_obj = load_project(project_dir)
+        dashboard_objs = record('module_exec', lambda: exec_dashboards(project_obj))
+        record('update_dashboard', lambda: [
+            dashboard_obj.update_dashboard(project_obj.id, project_obj.url) for dashboard_obj in dashboard_objs
+        ])
+        project_obj.dashboard_objs = {dashboard_obj.id: dashboard_obj for dashboard_obj in dashboard_objs}
+        project_obj.navigation = project_obj._get_navigation()
+
+        structure_obj = Structure(mode='full', project_objs={project_obj.id: project_obj})
+        record('collect_callbacks', lambda: (clear_registered_callbacks(), structure_obj._collect_callbacks()))
+        size = record('layout_serialization', lambda: serialize(structure_obj))
+        results[-1]['payload_bytes'] = size
+    finally:
+        sys.path[:] = path
+        sys.modules.pop('datasources', None)
+        clear_registered_callbacks()
+    return results
+
+
+def scaling(results: list) -> dict:
+    """ Exponent of the time of every stage against the number of windows of the project, by the filter counts """
+    report = {}
+    for stage in dict.fromkeys(r['stage'] for r in results):
+        for n_filters in sorted({r['filters'] for r in results}):
+            points = [(r['dashboards'] * r['windows'], r['seconds']) for r in results
+                      if r['stage'] == stage and r['filters'] == n_filters and r['seconds'] > 0]
+            if len({windows for windows, _ in points}) < 2:
+                continue
+            windows, seconds = np.log(np.array(points, dtype=float)).T
+            largest = max(points)
+            report[f'{stage} filters={n_filters}'] = {
+                'exponent': float(np.polyfit(windows, seconds, 1)[0]),
+                'ms_per_window': largest[1] * 1000 / largest[0],
+            }
+    return report
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """ Returns the stages that got slower or hungrier than the baseline by more than the tolerance """
+    key = lambda r: (r['stage'], r['dashboards'], r['windows'], r['filters'])
+    baseline = {key(r): r for r in baseline}
+    regressions = []
+    for result in results:
+        base = baseline.get(key(result))
+        if not base:
+            continue
+        for metric in ['seconds', 'peak_bytes']:
+            if base[metric] and result[metric] / base[metric] > 1 + tolerance:
+                regressions.append({**result, 'metric': metric, 'ratio': result[metric] / base[metric]})
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dashboards', nargs='+', type=int, default=[1, 10, 100])
+    parser.add_argument('--windows', nargs='+', type=int, default=[1, 10, 50])
+    parser.add_argument('--filters', nargs='+', type=int, default=[10])
+    parser.add_argument('--max-windows', type=int, default=5000,
+                        help='cases with more windows in the project are skipped')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs of every stage, the best time is kept so the first case isn\'t measured cold')
+    parser.add_argument('--output', default=join(RESULTS_DIR, 'assembly.json'))
+    parser.add_argument('--baseline', default=join(RESULTS_DIR, 'assembly-baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=.25)
+    args = parser.parse_args(argv)
+
+    results = []
+    with TemporaryDirectory() as directory:
+        data_dir = join(directory, 'data')
+        for n_filters in args.filters:
+            makedirs(data_dir, exist_ok=True)
+            write_facts(data_dir, n_filters)
+            for n_dashboards in args.dashboards:
+                for n_windows in args.windows:
+                    if n_dashboards * n_windows > args.max_windows:
+                        print(f'Skipped dashboards={n_dashboards} windows={n_windows}, see --max-windows')
+                        continue
+                    results.extend(run_case(directory, data_dir, n_dashboards, n_windows, n_filters, args.repeat))
+
+    report = scaling(results)
+    for name, stage in report.items():
+        print(f"{name:<34} exponent {stage['exponent']:5.2f} {stage['ms_per_window']:8.3f} ms per window")
+
+    output = args.baseline if args.save_baseline else args.output
+    makedirs(dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'meta': {
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'dash': dash.__version__,
+                'machine': platform.machine(),
+            },
+            'scaling': report,
+            'results': results,
+        }, f, indent=2)
+    print(f'Results written to {output}')
+
+    if not args.save_baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)['results']
+        except FileNotFoundError:
+            return 0
+        regressions = compare(results, baseline, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['stage']} dashboards={r['dashboards']} windows={r['windows']} "
+                  f"filters={r['filters']} {r['metric']} x{r['ratio']:.2f}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+Minimal Dash renderer stand-in. It keeps the component properties of the page and replays the
+_dash-update-component request chains the browser would send, without a browser.
+"""
+import json
+from http.client import HTTPConnection, HTTPSConnection
+from functools import lru_cache
+from time import perf_counter
+from urllib.parse import urlsplit
+from dash.exceptions import PreventUpdate
+from components.tables import payload_rows, selected_keys
+from components.clientside import filter_rows, rows_table
+
+
+class FlaskTransport:
+    """ Sends requests to the flask server in-process through its test client """
+
+    def __init__(self, server):
+        self.client = server.test_client()
+
+    def request(self, method: str, path: str, body: dict = None) -> tuple:
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, response.get_data()
+
+
+class HTTPTransport:
+    """ Sends requests to a running server over a persistent HTTP connection """
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        connection = HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+        self.connection = connection(parts.netloc)
+        self.prefix = parts.path.rstrip('/')
+
+    def request(self, method: str, path: str, body: dict = None) -> tuple:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        self.connection.request(method, self.prefix + path, json.dumps(body) if body is not None else None, headers)
+        response = self.connection.getresponse()
+        return response.status, response.read()
+
+
+def component_key(component_id) -> str:
+    if isinstance(component_id, dict):
+        return json.dumps(component_id, sort_keys=True, separators=(',', ':'))
+    return component_id
+
+
+@lru_cache(maxsize=None)
+def parse_id(key: str):
+    return json.loads(key) if key.startswith('{') else key
+
+
+def wildcard_keys(pattern: dict) -> dict:
+    """ Keys of a pattern-matching id with their wildcard: MATCH, ALL or ALLSMALLER """
+    return {key: value[0] for key, value in pattern.items() if isinstance(value, list)}
+
+
+def id_matches(pattern: dict, component_id, match: dict = None) -> bool:
+    """ Whether the dict id fits the pattern, MATCH keys must also have the values of match if it's given """
+    if not isinstance(component_id, dict) or pattern.keys() != component_id.keys():
+        return False
+    for key, value in pattern.items():
+        if isinstance(value, list):
+            if value[0] == 'MATCH' and match is not None and match.get(key, component_id[key]) != component_id[key]:
+                return False
+        elif value != component_id[key]:
+            return False
+    return True
+
+
+def walk_layout(node, props: dict) -> None:
+    """ Collects (component id, property) -> value of every component of the tree having an id """
+    if isinstance(node, list):
+        for child in node:
+            walk_layout(child, props)
+    elif isinstance(node, dict) and 'props' in node and 'type' in node:
+        if 'id' in node['props']:
+            key = component_key(node['props']['id'])
+            for prop, value in node['props'].items():
+                props[(key, prop)] = value
+        for value in node['props'].values():
+            walk_layout(value, props)
+
+
+# Clientside functions the client runs in place of the browser, the callbacks of the other ones are skipped
+CLIENTSIDE_FUNCTIONS = {
+    ('tables', 'rows'): payload_rows, ('tables', 'selection'): selected_keys,
+    ('datasources', 'filter'): filter_rows, ('datasources', 'table'): rows_table
+}
+
+
+def clientside_function(dependency: dict):
+    function = dependency.get('clientside_function')
+    return CLIENTSIDE_FUNCTIONS.get((function['namespace'], function['function_name'])) if function else None
+
+
+def split_output(output: str) -> list:
+    parts = output[2:-2].split('...') if output.startswith('..') else [output]
+    return [tuple(part.rsplit('.', 1)) for part in parts]
+
+
+class DashClient:
+    def __init__(self, transport, dependencies: list = None):
+        self.transport = transport
+        self.dependencies = dependencies
+        self.props = {}
+        self.components = set()
+        self.timings = []
+
+    def _update(self, props: dict) -> None:
+        self.props.update(props)
+        self.components.update(component for component, _ in props.keys())
+
+    def _get_json(self, path: str):
+        status, data = self.transport.request('GET', path)
+        if status != 200:
+            raise RuntimeError(f'GET {path} returned {status}')
+        return json.loads(data)
+
+    def load(self, url: str) -> None:
+        """ Loads the page as the browser does: index, layout, dependencies and the initial callbacks """
+        start = perf_counter()
+        status, _ = self.transport.request('GET', url)
+        self.timings.append(('GET index', perf_counter() - start, status))
+        self.props, self.components = {}, set()
+        layout_props = {}
+        walk_layout(self._get_json('/_dash-layout'), layout_props)
+        if self.dependencies is None:
+            self.dependencies = self._get_json('/_dash-dependencies')
+        self._update(layout_props)
+        self.fire(set(self.props.keys()), initial=True)
+        # dcc.Location reports the pathname after mounting, so it's a regular change rather than an initial call
+        self.set_props({('url', 'pathname'): url})
+
+    def set_props(self, values: dict) -> None:
+        """ Changes component properties as a user would and runs the triggered callbacks """
+        values = self._run_clientside(values)
+        self._update(values)
+        self.fire(set(values.keys()))
+
+    def _value(self, key: tuple):
+        return self.props.get(key)
+
+    def _resolve(self, component: str, prop: str, match: dict) -> list or tuple or None:
+        """
+        Concrete components of a dependency: the component itself for a plain id, the component with the MATCH values
+        of the triggering component for a MATCH pattern and the list of all matching components for an ALL pattern
+        """
+        pattern = parse_id(component)
+        if not isinstance(pattern, dict):
+            return (component, prop) if component in self.components else None
+        if not wildcard_keys(pattern):
+            return (component, prop) if component in self.components else None
+        found = [
+            (key, prop) for key in sorted(self.components)
+            if key.startswith('{') and id_matches(pattern, parse_id(key), match)
+        ]
+        if 'ALL' in wildcard_keys(pattern).values():
+            return found
+        return found[0] if found else None
+
+    def _spec(self, resolved, with_value: bool = True):
+        if isinstance(resolved, list):
+            return [self._spec(item, with_value) for item in resolved]
+        component, prop = resolved
+        spec = {'id': parse_id(component), 'property': prop}
+        if with_value:
+            spec['value'] = self._value(resolved)
+        return spec
+
+    def _body(self, dependency: dict, triggered: list, resolved: dict) -> dict:
+        outputs = [self._spec(resolved[key], with_value=False) for key in split_output(dependency['output'])]
+        return {
+            'output': dependency['output'],
+            'outputs': outputs if dependency['output'].startswith('..') else outputs[0],
+            'inputs': [self._spec(resolved[(i['id'], i['property'])]) for i in dependency['inputs']],
+            'state': [self._spec(resolved[(s['id'], s['property'])]) for s in dependency['state']],
+            'changedPropIds': [f'{i}.{p}' for i, p in triggered],
+        }
+
+    def _triggers(self, dependency: dict, changed: set) -> dict:
+        """ Changed properties triggering the dependency grouped by the MATCH values of the triggering components """
+        groups = {}
+        for component, prop in changed:
+            for i in dependency['inputs']:
+                if i['property'] != prop:
+                    continue
+                if i['id'] == component:
+                    groups.setdefault((), []).append((component, prop))
+                elif i['id'].startswith('{') and component.startswith('{'):
+                    pattern, concrete = parse_id(i['id']), parse_id(component)
+                    if id_matches(pattern, concrete):
+                        match = tuple(sorted(
+                            (key, concrete[key]) for key, value in wildcard_keys(pattern).items() if value == 'MATCH'
+                        ))
+                        groups.setdefault(match, []).append((component, prop))
+        return groups
+
+    def _run_clientside(self, new_props: dict) -> dict:
+        """
+        Adds the outputs of the known clientside functions triggered by the new properties. They run right away, as
+        the renderer holds the callbacks depending on their outputs until they have run
+        """
+        props = dict(new_props)
+        changed = set(new_props)
+        while changed:
+            updates = {}
+            for dependency in self.dependencies:
+                function = clientside_function(dependency)
+                inputs = [(i['id'], i['property']) for i in dependency['inputs']]
+                if function is None or not changed & set(inputs):
+                    continue
+                states = [(s['id'], s['property']) for s in dependency['state']]
+                values = [props.get(key, self._value(key)) for key in inputs + states]
+                try:
+                    updates[split_output(dependency['output'])[0]] = function(*values)
+                except PreventUpdate:
+                    continue
+            props.update(updates)
+            changed = set(updates)
+        return props
+
+    def fire(self, changed: set, initial: bool = False) -> None:
+        queue = [(changed, initial)]
+        while queue:
+            changed, initial = queue.pop(0)
+            for dependency in self.dependencies:
+                if dependency.get('clientside_function'):
+                    continue
+                if initial and dependency.get('prevent_initial_call'):
+                    continue
+                keys = [(d['id'], d['property']) for d in dependency['inputs'] + dependency['state']]
+                keys += split_output(dependency['output'])
+                for match, triggered in self._triggers(dependency, changed).items():
+                    resolved = {key: self._resolve(*key, dict(match)) for key in keys}
+                    if any(value is None for value in resolved.values()):
+                        continue
+                    outputs = set()
+                    for key in split_output(dependency['output']):
+                        outputs.update(resolved[key] if isinstance(resolved[key], list) else [resolved[key]])
+                    if set(triggered) <= outputs:
+                        continue
+                    new_props = self.call(dependency, triggered, resolved)
+                    if new_props:
+                        new_props = self._run_clientside(new_props)
+                        added = {}
+                        for value in new_props.values():
+                            walk_layout(value, added)
+                        self._update(new_props)
+                        self._update(added)
+                        queue.append((set(new_props.keys()), False))
+                        if added:
+                            queue.append((set(added.keys()), True))
+
+    def call(self, dependency: dict, triggered: list, resolved: dict) -> dict:
+        body = self._body(dependency, triggered, resolved)
+        start = perf_counter()
+        status, data = self.transport.request('POST', '/_dash-update-component', body)
+        self.timings.append((dependency['output'], perf_counter() - start, status))
+        if status != 200:
+            return {}
+        response = json.loads(data)['response']
+        return {(component, prop): value for component, props in response.items() for prop, value in props.items()}
@@ -0,0 +1,161 @@
+"""
+Concurrent-user load test of the Dash server. Every simulated user loads a dashboard, clicks Apply with a randomized
+filter state and changes the table row selection, replaying the real _dash-update-component request chains.
+The report contains p50/p95/p99 latency and requests per second by callback.
+
+    python -m benchmarks.loadtest --users 20 --iterations 10 --url /test/test_task
+    python -m benchmarks.loadtest --users 20 --host http://127.0.0.1:8050 --url /test/test_task
+"""
+import argparse
+import json
+import random
+import sys
+from collections import defaultdict
+from os import makedirs
+from os.path import dirname, join, abspath
+from threading import Thread, Barrier
+from time import perf_counter, sleep
+import numpy as np
+from .client import DashClient, FlaskTransport, HTTPTransport, parse_id
+from components.constants import READY_ROUTE
+
+RESULTS_DIR = join(dirname(abspath(__file__)), 'results')
+
+
+def random_filter_values(client: DashClient, rng: random.Random) -> dict:
+    """ Random values for every filter and parameter component found on the page """
+    values = {}
+    for (component, prop), value in list(client.props.items()):
+        component_type = parse_id(component).get('type') if component.startswith('{') else None
+        if component_type in ('filter', 'parameter') and prop == 'options':
+            if client.props.get((component, 'value')) is None:
+                continue
+            options = [option['value'] for option in value]
+            if isinstance(client.props[(component, 'value')], list):
+                values[(component, 'value')] = rng.sample(options, rng.randint(1, len(options)))
+            else:
+                values[(component, 'value')] = rng.choice(options)
+        elif component_type == 'filter' and prop == 'min_date_allowed':
+            max_date = client.props[(component, 'max_date_allowed')]
+            dates = np.arange(np.datetime64(value[:10]), np.datetime64(max_date[:10]) + 1)
+            start, end = sorted(rng.sample(range(len(dates)), 2)) if len(dates) > 1 else (0, 0)
+            values[(component, 'start_date')] = str(dates[start])
+            values[(component, 'end_date')] = str(dates[end])
+    return values
+
+
+def apply_button(client: DashClient) -> tuple or None:
+    for component, prop in client.props.keys():
+        if component.startswith('{') and parse_id(component).get('type') == 'apply_filters_button' \
+                and prop == 'n_clicks':
+            return component, prop
+    return None
+
+
+def user_session(transport, url: str, iterations: int, seed: int, think_time: float, barrier: Barrier,
+                 timings: list, dependencies: list) -> None:
+    rng = random.Random(seed)
+    client = DashClient(transport, dependencies)
+    barrier.wait()
+    for _ in range(iterations):
+        client.load(url)
+        sleep(think_time)
+
+        button = apply_button(client)
+        if button:
+            values = random_filter_values(client, rng)
+            values[button] = (client.props.get(button) or 0) + 1
+            client.set_props(values)
+            sleep(think_time)
+
+        for (component, prop), data in list(client.props.items()):
+            if prop == 'data' and isinstance(component, str) and component.endswith('-table') and data:
+                rows = sorted(rng.sample(range(len(data)), rng.randint(1, len(data))))
+                client.set_props({(component, 'selected_rows'): rows})
+                sleep(think_time)
+    timings.extend(client.timings)
+
+
+def report(timings: list, wall_time: float) -> dict:
+    by_callback = defaultdict(list)
+    errors = defaultdict(int)
+    for name, seconds, status in timings:
+        by_callback[name].append(seconds)
+        if status >= 400:
+            errors[name] += 1
+    result = {
+        'requests': len(timings),
+        'wall_seconds': wall_time,
+        'requests_per_second': len(timings) / wall_time if wall_time else 0,
+        'callbacks': {},
+    }
+    for name, values in sorted(by_callback.items(), key=lambda item: -sum(item[1])):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        result['callbacks'][name] = {
+            'count': len(values), 'errors': errors[name], 'requests_per_second': len(values) / wall_time,
+            'p50': p50, 'p95': p95, 'p99': p99,
+        }
+    return result
+
+
+def wait_ready(transport, timeout: float = 300.) -> None:
+    """ Waits for the warm-up of the server, so the measured requests don't compete with it """
+    deadline = perf_counter() + timeout
+    while transport.request('GET', READY_ROUTE)[0] == 503 and perf_counter() < deadline:
+        sleep(.1)
+
+
+def print_report(result: dict) -> None:
+    print(f"{result['requests']} requests in {result['wall_seconds']:.1f}s, "
+          f"{result['requests_per_second']:.1f} req/s")
+    print(f"{'callback':<70} {'count':>6} {'err':>4} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, stats in result['callbacks'].items():
+        print(f"{name[:70]:<70} {stats['count']:>6} {stats['errors']:>4} {stats['requests_per_second']:>7.1f} "
+              f"{stats['p50'] * 1000:>8.1f} {stats['p95'] * 1000:>8.1f} {stats['p99'] * 1000:>8.1f}")
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='/test/test_task')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--think-time', type=float, default=0.)
+    parser.add_argument('--host', help='base URL of a running server, the app is served in-process if omitted')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=join(RESULTS_DIR, 'loadtest.json'))
+    args = parser.parse_args(argv)
+
+    if args.host:
+        make_transport = lambda: HTTPTransport(args.host)
+    else:
+        sys.path.insert(0, dirname(dirname(abspath(__file__))))
+        from app import server
+        make_transport = lambda: FlaskTransport(server)
+
+    wait_ready(make_transport())
+    dependencies = json.loads(make_transport().request('GET', '/_dash-dependencies')[1])
+    timings = []
+    barrier = Barrier(args.users + 1)
+    threads = [
+        Thread(target=user_session, args=(make_transport(), args.url, args.iterations, args.seed + i,
+                                          args.think_time, barrier, timings, dependencies))
+        for i in range(args.users)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = perf_counter()
+    for thread in threads:
+        thread.join()
+    result = report(timings, perf_counter() - start)
+    result['settings'] = {k: v for k, v in vars(args).items() if k != 'output'}
+
+    print_report(result)
+    makedirs(dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
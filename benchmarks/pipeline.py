@@ -0,0 +1,212 @@
+"""
+Benchmarks of the datasource, filter and window paths on synthetic Movements/Items-shaped data.
+Every stage runs through the real components without a browser. Results (time and peak memory) are written into
+a JSON file and optionally compared with a stored baseline.
+
+    python -m benchmarks.pipeline --rows 1e4 1e5 1e6 --items 10 1000
+    python -m benchmarks.pipeline --rows 1e6 --save-baseline
+    python -m benchmarks.pipeline --rows 1e6 --baseline benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+from copy import deepcopy
+from datetime import datetime
+from importlib.util import spec_from_file_location, module_from_spec
+from os import makedirs
+from os.path import dirname, join, abspath
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from components import DataSource
+from components.tables import table_data, selected_keys
+from .synthetic import write_dataset, item_names
+
+ROOT_DIR = dirname(dirname(abspath(__file__)))
+RESULTS_DIR = join(ROOT_DIR, 'benchmarks', 'results')
+DASHBOARD_PATH = join(ROOT_DIR, 'projects', 'test', 'dashboards', 'test_task.py')
+
+
+def measure(func, repeat: int = 3, reset=None) -> tuple:
+    """
+    Returns the result of the last run, the best time of all runs and the peak traced memory of an extra run.
+    reset is called before every run, so the runs don't hit the caches filled by the previous ones
+    """
+    seconds = []
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        start = perf_counter()
+        result = func()
+        seconds.append(perf_counter() - start)
+    if reset is not None:
+        reset()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, min(seconds), peak
+
+
+def load_dashboard_module(path: str = DASHBOARD_PATH):
+    spec = spec_from_file_location('benchmark_dashboard', path)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_datasources(directory: str, extension: str) -> dict:
+    read_args = {'sep': ';'} if extension == 'csv' else {}
+    datasources = {
+        'Movements': DataSource(f'Movements.{extension}', filter_columns={'Date': 'minmax'},
+                                set_date_columns={'Date': '%d.%m.%Y'}, data_dir=directory, **read_args),
+        'Items': DataSource(f'Items.{extension}', filter_columns={'Name': 'unique'}, data_dir=directory, **read_args),
+    }
+    return {ds_id: datasource.wait() for ds_id, datasource in datasources.items()}
+
+
+def filterpanel_states(dashboard, datasources: dict) -> dict:
+    """ Filter panel states selecting everything in the synthetic datasources """
+    states = dashboard.default_filterpanel_states()
+    for filter_obj in dashboard.filter_objs.values():
+        config = datasources[filter_obj.datasource_id].columns_config[filter_obj.source_column]
+        values = list(config) if not isinstance(config, dict) else list(config.keys())
+        if filter_obj.filter_type == 'daterange':
+            states[f'{filter_obj.component_id}.start_date'] = min(values)
+            states[f'{filter_obj.component_id}.end_date'] = max(values)
+        elif filter_obj.filter_type == 'interval':
+            states[f'{filter_obj.component_id}.value'] = [min(values), max(values)]
+        elif filter_obj.filter_type == 'radio':
+            states[f'{filter_obj.component_id}.value'] = values[0]
+        else:
+            states[f'{filter_obj.component_id}.value'] = values
+    return states
+
+
+def bind_dashboard(module, datasources: dict, n_items: int) -> None:
+    """ Points the window functions of the dashboard module to the synthetic datasources """
+    module.movements = datasources['Movements']
+    module.items = datasources['Items']
+    module.dashboard.datasource_objs.update(datasources)
+    datasources['Movements'].relate(datasources['Items'], on='ID')
+    rng = np.random.default_rng(0)
+    module.NAME_COLORS = {
+        name: f'rgba({r}, {g}, {b}, {{opacity}})'
+        for name, (r, g, b) in zip(item_names(n_items), rng.integers(0, 256, (n_items, 3)))
+    }
+
+
+def run_case(module, directory: str, n_rows: int, n_items: int, extension: str, repeat: int) -> list:
+    case = {'rows': n_rows, 'items': n_items, 'format': extension}
+    results = []
+
+    def record(stage, func, reset=None):
+        result, seconds, peak = measure(func, repeat, reset)
+        results.append({'stage': stage, **case, 'seconds': seconds, 'peak_bytes': peak})
+        print(f"{stage:<20} rows={n_rows:<11} items={n_items:<7} {seconds * 1000:10.1f} ms {peak / 2 ** 20:10.1f} MiB")
+        return result
+
+    write_dataset(directory, n_rows, n_items, extension)
+    datasources = record('datasource_load', lambda: load_datasources(directory, extension))
+    record('set_columns_config', lambda: (
+        datasources['Movements']._set_columns_config({'Date': 'minmax'}),
+        datasources['Items']._set_columns_config({'Name': 'unique'})
+    ))
+
+    bind_dashboard(module, datasources, n_items)
+    dashboard = module.dashboard
+    window_id = next(iter(dashboard.window_objs.keys()))
+    state = record('filter_state', lambda: dashboard.filterpanel_state(
+        filterpanel_states(dashboard, datasources), window_id
+    ))
+    record('filter_evaluation', lambda: [
+        datasources[ds_id].dataframe.query(expression) if expression else datasources[ds_id].dataframe
+        for ds_id, expression in state['query_expressions'].items()
+    ])
+
+    def clear_aggregates():
+        # The window stages measure the builds of the cubes and pyramids, not the cache hits
+        for datasource in datasources.values():
+            datasource._cubes.clear()
+            datasource._pyramids.clear()
+
+    columns, table, rows, _ = record('window_1', lambda: module.window_1(deepcopy(state)), clear_aggregates)
+    data = record('table_data', lambda: table_data(table))
+    selection = record('selection', lambda: selected_keys(
+        rows, data, {'key': dashboard.window_objs[window_id].selection_key}
+    ))
+    record('window_2', lambda: module.window_2(selection, deepcopy(state)), clear_aggregates)
+    record('window_3', lambda: module.window_3(selection, deepcopy(state)), clear_aggregates)
+    return results
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """ Returns the stages that got slower or hungrier than the baseline by more than the tolerance """
+    key = lambda r: (r['stage'], r['rows'], r['items'], r['format'])
+    baseline = {key(r): r for r in baseline}
+    regressions = []
+    for result in results:
+        base = baseline.get(key(result))
+        if not base:
+            continue
+        for metric in ['seconds', 'peak_bytes']:
+            if base[metric] and result[metric] / base[metric] > 1 + tolerance:
+                regressions.append({**result, 'metric': metric, 'ratio': result[metric] / base[metric]})
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', nargs='+', type=float, default=[1e4, 1e5, 1e6])
+    parser.add_argument('--items', nargs='+', type=int, default=[10, 100])
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=join(RESULTS_DIR, 'latest.json'))
+    parser.add_argument('--baseline', default=join(RESULTS_DIR, 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=.25)
+    args = parser.parse_args(argv)
+
+    module = load_dashboard_module()
+    results = []
+    with TemporaryDirectory() as directory:
+        for n_rows in args.rows:
+            for n_items in args.items:
+                results.extend(run_case(module, directory, int(n_rows), n_items, args.format, args.repeat))
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+    output = args.baseline if args.save_baseline else args.output
+    makedirs(dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {output}')
+
+    if not args.save_baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)['results']
+        except FileNotFoundError:
+            return 0
+        regressions = compare(results, baseline, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['stage']} rows={r['rows']} items={r['items']} {r['metric']} x{r['ratio']:.2f}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Offline replay of recorded callback traffic. Start the server with DASH_RECORD_PATH (and optionally
+DASH_RECORD_SAMPLE, the share of invocations to record) set to collect the log, then re-execute the recorded
+invocations against the current build and compare latency and outputs with the recording or with the replay
+results of another build.
+
+    python -m benchmarks.replay recordings/callbacks.jsonl.* --output benchmarks/results/replay-old.json
+    python -m benchmarks.replay recordings/callbacks.jsonl.* --compare benchmarks/results/replay-old.json
+
+Outputs depending on server-side state of the recorded session (server table stores) can't be reproduced offline
+and are reported as changed.
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from hashlib import sha1
+from os import makedirs
+from os.path import dirname, join, abspath
+from time import perf_counter
+import numpy as np
+from .client import FlaskTransport, HTTPTransport
+
+RESULTS_DIR = join(dirname(abspath(__file__)), 'results')
+
+
+def read_records(paths: list) -> list:
+    records = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    return sorted(records, key=lambda r: r['time'])
+
+
+def replay(transport, records: list, repeat: int = 1) -> list:
+    """ Re-executes every recorded invocation, keeping the best time and the hash of the response """
+    results = []
+    for i, record in enumerate(records):
+        seconds = []
+        for _ in range(repeat):
+            start = perf_counter()
+            status, data = transport.request('POST', '/_dash-update-component', record['body'])
+            seconds.append(perf_counter() - start)
+        results.append({
+            'record': i, 'output': record['output'], 'status': status, 'seconds': min(seconds),
+            'response_sha1': sha1(data).hexdigest(),
+        })
+    return results
+
+
+def summary(records: list, results: list, reference: list = None) -> dict:
+    """
+    Latency percentiles by callback for the recording and the replay, plus the number of outputs that differ
+    from the recording and, if given, from the reference replay of another build
+    """
+    by_callback = defaultdict(lambda: {'recorded': [], 'replayed': [], 'reference': [],
+                                       'changed': 0, 'changed_vs_reference': 0, 'errors': 0})
+    reference = {r['record']: r for r in reference} if reference else {}
+    for record, result in zip(records, results):
+        stats = by_callback[record['output']]
+        stats['recorded'].append(record['seconds'])
+        stats['replayed'].append(result['seconds'])
+        stats['errors'] += result['status'] >= 400
+        stats['changed'] += result['response_sha1'] != record['response_sha1']
+        other = reference.get(result['record'])
+        if other:
+            stats['reference'].append(other['seconds'])
+            stats['changed_vs_reference'] += result['response_sha1'] != other['response_sha1']
+
+    report = {}
+    for output, stats in sorted(by_callback.items(), key=lambda item: -sum(item[1]['replayed'])):
+        report[output] = {'count': len(stats['replayed'])}
+        for source in ['recorded', 'replayed', 'reference']:
+            if stats[source]:
+                p50, p95 = np.percentile(stats[source], [50, 95])
+                report[output][source] = {'p50': p50, 'p95': p95}
+        report[output].update({k: stats[k] for k in ['errors', 'changed']})
+        if stats['reference']:
+            report[output]['changed_vs_reference'] = stats['changed_vs_reference']
+    return report
+
+
+def print_summary(report: dict) -> None:
+    print(f"{'callback':<60} {'count':>6} {'err':>4} {'rec p50':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'ref p50':>8} {'changed':>8}")
+    for output, stats in report.items():
+        reference = stats.get('reference', {}).get('p50')
+        changed = stats.get('changed_vs_reference', stats['changed'])
+        print(f"{output[:60]:<60} {stats['count']:>6} {stats['errors']:>4} "
+              f"{stats['recorded']['p50'] * 1000:>8.1f} {stats['replayed']['p50'] * 1000:>8.1f} "
+              f"{stats['replayed']['p95'] * 1000:>8.1f} "
+              f"{reference * 1000 if reference is not None else float('nan'):>8.1f} {changed:>8}")
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('logs', nargs='+', help='recorder log files')
+    parser.add_argument('--host', help='base URL of a running server, the app is served in-process if omitted')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', default=join(RESULTS_DIR, 'replay.json'))
+    parser.add_argument('--compare', help='replay results of another build')
+    args = parser.parse_args(argv)
+
+    if args.host:
+        transport = HTTPTransport(args.host)
+    else:
+        sys.path.insert(0, dirname(dirname(abspath(__file__))))
+        from app import server
+        transport = FlaskTransport(server)
+        # Dash registers the global callbacks on the first request
+        transport.request('GET', '/_dash-dependencies')
+
+    records = read_records(args.logs)
+    results = replay(transport, records, args.repeat)
+    reference = None
+    if args.compare:
+        with open(args.compare) as f:
+            reference = json.load(f)['results']
+    report = summary(records, results, reference)
+    print_summary(report)
+
+    makedirs(dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'logs': args.logs, 'results': results, 'summary': report}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+from os.path import join
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 1_000_000
+START_DATE = '2015-01-01'
+DAYS = 365 * 8
+
+
+def item_names(n_items: int) -> list:
+    return [f'Item {i:05d}' for i in range(1, n_items + 1)]
+
+
+def generate_items(n_items: int) -> pd.DataFrame:
+    """ Items-shaped dimension table: ID;Name """
+    return pd.DataFrame({'ID': np.arange(1, n_items + 1), 'Name': item_names(n_items)})
+
+
+def generate_movements(n_rows: int, n_items: int, seed: int = 0, days: int = DAYS) -> pd.DataFrame:
+    """ Movements-shaped fact table: ID;Date;Movement with dates in the source %d.%m.%Y format """
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp(START_DATE) + pd.to_timedelta(np.sort(rng.integers(0, days, n_rows)), unit='D')
+    return pd.DataFrame({
+        'ID': rng.integers(1, n_items + 1, n_rows),
+        'Date': dates.strftime('%d.%m.%Y'),
+        'Movement': rng.integers(-500, 501, n_rows),
+    })
+
+
+def write_dataset(directory: str, n_rows: int, n_items: int, extension: str = 'csv', seed: int = 0) -> dict:
+    """
+    Writes Items and Movements files of the given size into directory. Movements are written in chunks so that
+    the generator itself never holds more than CHUNK_ROWS rows
+    """
+    paths = {'Items': join(directory, f'Items.{extension}'), 'Movements': join(directory, f'Movements.{extension}')}
+    items = generate_items(n_items)
+    if extension == 'csv':
+        items.to_csv(paths['Items'], sep=';', index=False)
+        for i, start in enumerate(range(0, n_rows, CHUNK_ROWS)):
+            chunk = generate_movements(min(CHUNK_ROWS, n_rows - start), n_items, seed + i)
+            chunk.to_csv(paths['Movements'], sep=';', index=False, mode='w' if i == 0 else 'a', header=i == 0)
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        items.to_parquet(paths['Items'], index=False)
+        writer = None
+        for i, start in enumerate(range(0, n_rows, CHUNK_ROWS)):
+            table = pa.Table.from_pandas(
+                generate_movements(min(CHUNK_ROWS, n_rows - start), n_items, seed + i), preserve_index=False
+            )
+            writer = writer if writer else pq.ParquetWriter(paths['Movements'], table.schema)
+            writer.write_table(table)
+        if writer:
+            writer.close()
+    return paths
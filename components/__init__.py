@@ -9,3 +9,4 @@ from .navbar import NavBar
 from .structure import Structure
 from .window import Window
 from .application import App
+from .dispatcher import Dispatcher
@@ -0,0 +1,211 @@
+"""
+Admission control of the callbacks and the exports. Every request gets a slot of the process before it runs, the
+waiting requests get the free slots by priority (UI callbacks, then window callbacks, then exports) and arrival.
+Some slots are kept for the UI callbacks, so heavy work never takes all of them, and a session runs at most
+session_slots heavy requests at once. At most queue_length requests wait, each one on a thread of the server: when
+the queue is full a request is rejected with 503 at once, unless it has a higher priority than the last waiting one,
+which is rejected instead. A waiting request is shed (answered with no update) when the same session requests the
+same outputs again, and rejected with 503 when it waits longer than the timeout. The sessions are told apart by
+a cookie.
+Every App with admission has its own scheduler, so the project apps of the in-process dispatcher don't share slots.
+Like the metrics, the numbers are per process: every worker should have more threads than slots + queue_length
+(gunicorn --threads 13 with the defaults) of all its apps, so the waiting requests never take the threads the pages
+and the other routes need, and a session runs up to session_slots heavy requests in every worker
+"""
+import json
+from functools import wraps
+from itertools import count
+from threading import Condition
+from time import perf_counter
+from uuid import uuid4
+import flask
+from dash.exceptions import PreventUpdate
+from .metrics import metrics, LABEL_NAMES
+from .constants import (
+    ADMISSION_SLOTS, ADMISSION_SESSION_SLOTS, ADMISSION_UI_RESERVE, ADMISSION_QUEUE_LENGTH, ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_COOKIE, LATENCY_BUCKETS
+)
+
+PRIORITIES = {'ui': 0, 'window': 1, 'export': 2}
+REJECTED_HELP = 'Requests rejected because the queue was full or they waited for a slot longer than the timeout'
+
+
+class Ticket:
+    def __init__(self, seq: int, session: str, priority: str, key, labels: tuple):
+        self.seq = seq
+        self.session = session
+        self.priority = priority
+        self.key = key
+        self.labels = labels
+        self.state = 'waiting'
+
+    @property
+    def heavy(self) -> bool:
+        return self.priority != 'ui'
+
+    def order(self) -> tuple:
+        return PRIORITIES[self.priority], self.seq
+
+
+class Scheduler:
+    def __init__(self, slots: int = ADMISSION_SLOTS, session_slots: int = ADMISSION_SESSION_SLOTS,
+                 ui_reserve: int = ADMISSION_UI_RESERVE, queue_length: int = ADMISSION_QUEUE_LENGTH,
+                 timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        if not 0 <= ui_reserve < slots:
+            raise ValueError(f'''
+                The slots kept for the UI callbacks should leave at least one slot for the heavy ones.
+                You've specified {ui_reserve} of {slots} slots
+            ''')
+        self.slots = slots
+        self.session_slots = session_slots
+        self.ui_reserve = ui_reserve
+        self.queue_length = queue_length
+        self.timeout = timeout
+        self._condition = Condition()
+        self._seq = count()
+        self._waiting = []
+        self.running = 0
+        self.running_heavy = 0
+        self._sessions = {}
+
+    def _fits(self, ticket: Ticket) -> bool:
+        if self.running >= self.slots:
+            return False
+        if not ticket.heavy:
+            return True
+        return (self.running_heavy < self.slots - self.ui_reserve
+                and self._sessions.get(ticket.session, 0) < self.session_slots)
+
+    def _start(self, ticket: Ticket) -> None:
+        ticket.state = 'running'
+        self.running += 1
+        if ticket.heavy:
+            self.running_heavy += 1
+            self._sessions[ticket.session] = self._sessions.get(ticket.session, 0) + 1
+
+    def _dispatch(self) -> None:
+        """ Starts the waiting tickets fitting the free slots by priority and arrival """
+        for ticket in sorted(self._waiting, key=Ticket.order):
+            if self._fits(ticket):
+                self._leave_queue(ticket, 'waiting')
+                self._start(ticket)
+        self._condition.notify_all()
+
+    def _leave_queue(self, ticket: Ticket, state: str) -> None:
+        self._waiting.remove(ticket)
+        ticket.state = state
+        metrics.add('dash_admission_queued', ticket.labels, -1, 'Requests waiting for a slot')
+
+    def admit(self, session: str, priority: str, key=None, labels: tuple = ('', '', '')) -> Ticket:
+        """
+        Waits for a slot. Raises PreventUpdate if the request is superseded while waiting and aborts it with 503 if
+        the queue is full or it doesn't get a slot in time. The ticket must be released once the request is done
+        """
+        start = perf_counter()
+        with self._condition:
+            ticket = Ticket(next(self._seq), session, priority, key, labels)
+            if key is not None:
+                for waiting in [t for t in self._waiting if t.session == session and t.key == key]:
+                    self._leave_queue(waiting, 'shed')
+                    metrics.inc('dash_admission_shed_total', waiting.labels,
+                                help_text='Waiting requests superseded by a newer request of the session')
+                    self._condition.notify_all()
+            if self._fits(ticket) and not any(t.order() < ticket.order() for t in self._waiting if self._fits(t)):
+                self._start(ticket)
+            else:
+                if len(self._waiting) >= self.queue_length:
+                    last = max(self._waiting, key=Ticket.order, default=None)
+                    if last is None or last.order() < ticket.order():
+                        ticket.state = 'rejected'
+                        metrics.inc('dash_admission_rejected_total', labels, help_text=REJECTED_HELP)
+                    else:
+                        self._leave_queue(last, 'rejected')
+                        metrics.inc('dash_admission_rejected_total', last.labels, help_text=REJECTED_HELP)
+                        self._condition.notify_all()
+                if ticket.state == 'waiting':
+                    self._waiting.append(ticket)
+                    metrics.add('dash_admission_queued', labels, 1, 'Requests waiting for a slot')
+                    self._condition.wait_for(lambda: ticket.state != 'waiting', self.timeout)
+                    if ticket.state == 'waiting':
+                        self._leave_queue(ticket, 'rejected')
+                        metrics.inc('dash_admission_rejected_total', labels, help_text=REJECTED_HELP)
+        metrics.observe('dash_admission_wait_seconds', labels, perf_counter() - start, LATENCY_BUCKETS,
+                        'Time requests waited for a slot')
+        if ticket.state == 'shed':
+            raise PreventUpdate
+        if ticket.state == 'rejected':
+            flask.abort(flask.Response('The server is busy, try again later', status=503, mimetype='text/plain',
+                                       headers={'Retry-After': '1'}))
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        with self._condition:
+            if ticket.state != 'running':
+                return
+            ticket.state = 'done'
+            self.running -= 1
+            if ticket.heavy:
+                self.running_heavy -= 1
+                self._sessions[ticket.session] -= 1
+                if not self._sessions[ticket.session]:
+                    del self._sessions[ticket.session]
+            self._dispatch()
+
+
+def session_key() -> str:
+    """ Session of the request, the address of the client until it gets the session cookie """
+    return flask.request.cookies.get(ADMISSION_COOKIE) or flask.g.get('admission_session') or flask.request.remote_addr
+
+
+def admission_middleware(scheduler: Scheduler):
+    """
+    Callback middleware admitting the callbacks through the scheduler. Window callbacks are heavy, the other ones are
+    UI callbacks. The requests of a callback for the same concrete outputs (the MATCH values) supersede each other
+    """
+
+    def admit(func, callback_obj):
+        priority = 'window' if callback_obj.labels['window'] else 'ui'
+        labels = tuple(callback_obj.labels[name] for name in LABEL_NAMES)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not flask.has_request_context():
+                return func(*args, **kwargs)
+            outputs = json.dumps(flask.g.get('outputs_list'), sort_keys=True, default=str)
+            ticket = scheduler.admit(session_key(), priority, (callback_obj.output_id, outputs), labels)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                scheduler.release(ticket)
+
+        return wrapper
+
+    return admit
+
+
+def admit_export(scheduler: Scheduler, response_func, labels: tuple):
+    """ Admits an export, the slot is kept until the streamed response is closed """
+    ticket = scheduler.admit(session_key(), 'export', labels=labels)
+    try:
+        response = response_func()
+    except BaseException:
+        scheduler.release(ticket)
+        raise
+    response.call_on_close(lambda: scheduler.release(ticket))
+    return response
+
+
+def init_admission(server) -> None:
+    """ Gives every browser a session cookie, so the requests of its tabs share the session limits """
+
+    @server.before_request
+    def new_session():
+        if ADMISSION_COOKIE not in flask.request.cookies:
+            flask.g.admission_session = uuid4().hex
+
+    @server.after_request
+    def set_session(response):
+        session = flask.g.get('admission_session')
+        if session is not None:
+            response.set_cookie(ADMISSION_COOKIE, session, httponly=True, samesite='Lax')
+        return response
@@ -1,6 +1,18 @@
 from dash import Dash
 from .structure import Structure
+from .callback import register_callbacks
+from .project import lazy_loading
+from .loader import DashboardLoader
+from .pagecache import init_page_cache
+from .snapshot import build_snapshot, write_snapshot, load_snapshot
+from .metrics import instrument, init_metrics
+from .profiler import profile, profiler_token, init_profiler
+from .recorder import record, recorder_settings, init_recorder
+from .export import init_export
+from .warmup import serve_warm, init_warmup
+from .admission import Scheduler, admission_middleware, init_admission
 from .funcs import get_names
+from .constants import LAZY_MAX_DASHBOARDS
 from dash_bootstrap_components.themes import SLATE
 try:
     from typing import Literal
@@ -10,36 +22,76 @@ from importlib.util import spec_from_file_location, module_from_spec
 from sys import modules
 from os import path
 from inspect import stack
+from concurrent.futures import ThreadPoolExecutor
 
 
 class App:
     def __init__(self, mode: Literal['full', 'project', 'dashboard'] = 'full', projects_to_get: list = None,
                  dashboard_objs: dict = None, dashboard_div=None, filterpanel_comp=None, overview_modal=None,
-                 callbacks: list = None):
+                 callbacks: list = None, metrics: bool = True, lazy: bool = False,
+                 max_dashboards: int = LAZY_MAX_DASHBOARDS, page_cache: bool = True, snapshot: str = None,
+                 projects_path: str = None, requests_pathname_prefix: str = None, warmup: bool = False,
+                 admission: bool = False):
+        """
+        With warmup the window callbacks of every dashboard are run on a background thread with the default filter
+        values and answered from the result cache for the same inputs, the readiness route reports when it's done.
+        With admission the callbacks and the exports wait for a slot of the app by priority (see admission.py)
+        """
+        # The callbacks of the app are wrapped with these middlewares, the first one is the outermost, so with admission
+        # the other ones see only the admitted requests
+        self.scheduler = Scheduler() if admission else None
+        self.middlewares = [
+            middleware for middleware, enabled in [
+                (admission_middleware(self.scheduler), admission), (instrument, metrics), (profile, profiler_token()),
+                (record, recorder_settings()[0]), (serve_warm, warmup)
+            ] if enabled
+        ]
         self.app = Dash(
             __name__, suppress_callback_exceptions=True, external_stylesheets=[SLATE],
-            meta_tags=[{'name': 'viewport', 'content': 'width=device-width, initial-scale=1.0'}]
+            meta_tags=[{'name': 'viewport', 'content': 'width=device-width, initial-scale=1.0'}],
+            requests_pathname_prefix=requests_pathname_prefix
         )
+        self.projects_path = projects_path
+        self.lazy = lazy
+        self.max_dashboards = max_dashboards
+        self.snapshot_path = snapshot
+        self.snapshot = None
         self._get_structure(mode=mode, projects_to_get=projects_to_get, dashboard_objs=dashboard_objs,
                             overview_modal=overview_modal, filterpanel_comp=filterpanel_comp,
                             dashboard_div=dashboard_div, callbacks=callbacks)
         self.app.layout = self.structure_obj.layout
+        register_callbacks(self.app)
         self.server = self.app.server
+        if self.structure_obj.loader is not None:
+            self.structure_obj.loader.bind(self.app)
+        if page_cache and mode in ['full', 'project']:
+            init_page_cache(self.server, self.structure_obj)
+        if mode in ['full', 'project']:
+            self.warmup = init_warmup(self.server, self.structure_obj, warmup)
+        if metrics:
+            init_metrics(self.server)
+        if admission:
+            init_admission(self.server)
+        init_export(self.server, self.structure_obj, self.scheduler)
+        if profiler_token():
+            init_profiler(self.server)
+        if recorder_settings()[0]:
+            init_recorder(self.server)
 
     def _get_projects(self) -> dict:
         """
         Gets the projects objects. If you specify a list of projects you want to read from projects directory,
         a validity check is carried out on the defined projects. If all of the listed project names
         (the names of the directories where the individual projects reside) are valid, then the import of Project class
-        objects, which are defined in separate project.py files, is performed and each such object is placed in the list
+        objects, which are defined in separate project.py files, is performed and each such object is placed in the list.
+        The projects are imported on a thread pool, but they are registered in the listed order and if several imports
+        fail, the error of the first listed project is raised
         """
         if set(self.projects_to_get).issubset(set(self.all_projects)):
             project_objs = {}
-            for project in self.projects_to_get:
-                project_path = path.join(self.projects_path, project, 'project.py')
-                spec = spec_from_file_location('project', project_path)
-                module = module_from_spec(spec)
-                spec.loader.exec_module(module)
+            with ThreadPoolExecutor(thread_name_prefix='project') as pool:
+                project_modules = list(pool.map(self._import_project, self.projects_to_get))
+            for module in project_modules:
                 modules['project'] = module
                 project_obj = vars(module)['project']
                 project_objs[project_obj.id] = project_obj
@@ -51,24 +103,47 @@ class App:
                     You've specified {self.projects_to_get}
             ''')
 
+    def _import_project(self, project: str):
+        project_path = path.join(self.projects_path, project, 'project.py')
+        spec = spec_from_file_location('project', project_path)
+        module = module_from_spec(spec)
+        token = lazy_loading.set(self.lazy)
+        try:
+            spec.loader.exec_module(module)
+        finally:
+            lazy_loading.reset(token)
+        return module
+
     def _get_structure(
             self, mode: Literal['full', 'project', 'dashboard'] = 'full', projects_to_get: list = None,
             dashboard_objs: dict = None, filterpanel_comp=None, dashboard_div=None, overview_modal=None,
             callbacks: list = None
     ) -> None:
         if mode == 'full':
-            self.projects_path = path.join(path.split(stack()[2][1])[0], 'projects')
+            if self.projects_path is None:
+                self.projects_path = path.join(path.split(stack()[2][1])[0], 'projects')
             self.all_projects = get_names(self.projects_path)
             self.projects_to_get = projects_to_get if projects_to_get else self.all_projects
+            if self.snapshot_path:
+                self.snapshot = load_snapshot(self.snapshot_path, self.projects_path, self.projects_to_get)
+                self.lazy = self.lazy or self.snapshot is not None
             self.project_objs = self._get_projects()
-            self.structure_obj = Structure(mode=mode, project_objs=self.project_objs)
+            if self.snapshot:
+                for project_id, navigation in self.snapshot['navigation'].items():
+                    self.project_objs[project_id].navigation.update(navigation)
+            loader = DashboardLoader(self.project_objs, self.max_dashboards, self.snapshot,
+                                     self.middlewares) if self.lazy else None
+            self.structure_obj = Structure(mode=mode, project_objs=self.project_objs, loader=loader,
+                                           middlewares=self.middlewares)
+            if self.snapshot_path and self.snapshot is None and not self.lazy:
+                write_snapshot(self.snapshot_path, build_snapshot(self))
         elif mode == 'project':
             self.dashboard_objs = dashboard_objs
-            self.structure_obj = Structure(mode=mode, dashboard_objs=self.dashboard_objs)
+            self.structure_obj = Structure(mode=mode, dashboard_objs=self.dashboard_objs, middlewares=self.middlewares)
         else:
             self.structure_obj = Structure(
                 mode=mode, overview_modal=overview_modal, filterpanel_comp=filterpanel_comp,
-                dashboard_div=dashboard_div, callbacks=callbacks
+                dashboard_div=dashboard_div, callbacks=callbacks, middlewares=self.middlewares
             )
 
     def run_app(self):
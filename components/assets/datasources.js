@@ -0,0 +1,85 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    datasources: {
+        // Requests the columnar copy of the datasource unless the stored one has the current version
+        stale: function (timestamp, version, data) {
+            if (data && data.version === version) {
+                return window.dash_clientside.no_update;
+            }
+            return version;
+        },
+        // Rows of the columnar copy passing the filters of the window and the parameter predicates of the config
+        filter: function (filterpanel_values, payload, config) {
+            if (!filterpanel_values || !payload || !config) {
+                return window.dash_clientside.no_update;
+            }
+            const predicates = [];
+            const filters = (filterpanel_values.filters || {})[config.datasource] || {};
+            for (const column in filters) {
+                const [filter_type, value] = filters[column];
+                if (filter_type === 'checkbox') {
+                    predicates.push([column, 'in', value || []]);
+                } else if (filter_type === 'radio') {
+                    predicates.push([column, '==', value]);
+                } else {
+                    predicates.push([column, '>=', value[0]], [column, '<=', value[1]]);
+                }
+            }
+            const parameters = filterpanel_values.parameters || {};
+            for (const parameter in config.parameters) {
+                predicates.push(...(config.parameters[parameter][parameters[parameter]] || []));
+            }
+            const columns = payload.columns;
+            const tests = predicates.map(([column, operator, target]) => {
+                const values = payload.values[columns.indexOf(column)];
+                if (operator === 'in' || operator === 'not in') {
+                    const targets = new Set(target);
+                    const inside = operator === 'in';
+                    return row => targets.has(values[row]) === inside;
+                }
+                return row => {
+                    const value = values[row];
+                    if (value === null || target === null) {
+                        return operator === '!=' && value !== target;
+                    }
+                    switch (operator) {
+                        case '==': return value === target;
+                        case '!=': return value !== target;
+                        case '<': return value < target;
+                        case '<=': return value <= target;
+                        case '>': return value > target;
+                        default: return value >= target;
+                    }
+                };
+            });
+            const length = columns.length ? payload.values[0].length : 0;
+            const rows = [];
+            for (let row = 0; row < length; row++) {
+                if (tests.every(test => test(row))) {
+                    rows.push(row);
+                }
+            }
+            return Object.assign({}, config, {
+                version: payload.version,
+                columns: columns,
+                values: payload.values.map(values => rows.map(row => values[row]))
+            });
+        },
+        // DataTable columns and records of the rows store of a clientside window
+        table: function (rows) {
+            if (!rows || !rows.columns) {
+                return window.dash_clientside.no_update;
+            }
+            const columns = rows.columns.map(column => ({name: column, id: column}));
+            const length = columns.length ? rows.values[0].length : 0;
+            const records = new Array(length);
+            for (let i = 0; i < length; i++) {
+                const record = {};
+                for (let j = 0; j < rows.columns.length; j++) {
+                    record[rows.columns[j]] = rows.values[j][i];
+                }
+                records[i] = record;
+            }
+            return [columns, records];
+        }
+    }
+});
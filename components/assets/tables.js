@@ -0,0 +1,31 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    tables: {
+        // Turns the columnar payload of a table window into DataTable records
+        rows: function (payload) {
+            if (!payload) {
+                return window.dash_clientside.no_update;
+            }
+            const columns = payload.columns;
+            const values = payload.values;
+            const length = values.length ? values[0].length : 0;
+            const rows = new Array(length);
+            for (let i = 0; i < length; i++) {
+                const row = {};
+                for (let j = 0; j < columns.length; j++) {
+                    row[columns[j]] = values[j][i];
+                }
+                rows[i] = row;
+            }
+            return rows;
+        },
+        // Publishes the key values of the selected rows, the dependent windows don't need the table data
+        selection: function (selected_rows, data, selection) {
+            if (!data || !selection) {
+                return window.dash_clientside.no_update;
+            }
+            const key = selection.key;
+            const keys = (selected_rows || []).filter(row => row < data.length).map(row => data[row][key]);
+            return {key: key, keys: keys};
+        }
+    }
+});
@@ -1,14 +1,61 @@
-from dash import Output, Input, State, callback
+from dash import Output, Input, State, ClientsideFunction, callback, clientside_callback, _callback
+from dash._utils import create_callback_id
 
 
 class Callback:
-    def __init__(self, func, outputs: list, inputs: list, states: list = None, initial_call: bool = False):
+    def __init__(self, func, outputs: list, inputs: list, states: list = None, initial_call: bool = False,
+                 labels: dict = None, middlewares: list = None):
         self.func = func
+        self.middlewares = middlewares if middlewares else []
         self.prevent_initial_call = True if initial_call is False else False
         self.outputs = [Output(outp[0], outp[1]) for outp in outputs]
         self.inputs = [Input(inp[0], inp[1]) for inp in inputs]
         self.states = [State(st[0], st[1]) for st in states] if states else []
-        self.callback = callback(
-            *self.outputs, *self.inputs, *self.states,
-            prevent_initial_call=self.prevent_initial_call
-        )(self.func)
+        self.output_id = create_callback_id(self.outputs if len(self.outputs) > 1 else self.outputs[0])
+        self.labels = {'dashboard': '', 'window': '', 'output': self.output_id, **(labels if labels else {})}
+        if isinstance(self.func, ClientsideFunction):
+            # Runs in the browser, so there is nothing to wrap with the middlewares
+            self.callback = clientside_callback(
+                self.func, *self.outputs, *self.inputs, *self.states,
+                prevent_initial_call=self.prevent_initial_call
+            )
+        else:
+            self.callback = callback(
+                *self.outputs, *self.inputs, *self.states,
+                prevent_initial_call=self.prevent_initial_call
+            )(self._wrap(self.func))
+
+    @staticmethod
+    def spec(outputs: list, inputs: list, states: list = None, initial_call: bool = False, func=None,
+             **kwargs) -> dict:
+        """ Dependency spec of the callback as Dash serves it to the browser, the function isn't needed for it """
+        outputs = [Output(outp[0], outp[1]) for outp in outputs]
+        return {
+            'output': create_callback_id(outputs if len(outputs) > 1 else outputs[0]),
+            'inputs': [Input(inp[0], inp[1]).to_dict() for inp in inputs],
+            'state': [State(st[0], st[1]).to_dict() for st in states] if states else [],
+            'clientside_function': {'namespace': func.namespace, 'function_name': func.function_name}
+            if isinstance(func, ClientsideFunction) else None,
+            'prevent_initial_call': initial_call is False,
+        }
+
+    def _wrap(self, func):
+        """ Applies the middlewares of the app. The first middleware becomes the outermost one """
+        for middleware in reversed(self.middlewares):
+            func = middleware(func, self)
+        return func
+
+
+def register_callbacks(app) -> list:
+    """
+    Moves the callbacks registered with dash.callback into the app. Dash does it only once before the first request
+    and for the app that gets it first, so the callbacks have to be moved here when several apps are assembled in one
+    process or when dashboards are imported after the first request. Returns the moved callback ids
+    """
+    known = {spec['output'] for spec in app._callback_list}
+    callback_ids = list(_callback.GLOBAL_CALLBACK_MAP)
+    for callback_id in callback_ids:
+        app.callback_map[callback_id] = _callback.GLOBAL_CALLBACK_MAP.pop(callback_id)
+    app._callback_list.extend(spec for spec in _callback.GLOBAL_CALLBACK_LIST if spec['output'] not in known)
+    _callback.GLOBAL_CALLBACK_LIST.clear()
+    return callback_ids
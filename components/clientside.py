@@ -0,0 +1,116 @@
+"""
+Browser-side filtering. A datasource declared with clientside=True is sent to the browser once per version as
+a columnar payload {'version', 'columns', 'values'} kept in the local storage, and the windows declared with
+clientside=datasource_id get the rows of the payload passing the filters of their filter panel state in their rows
+store, so the filter changes are applied without a window callback on the server (datasources.filter in
+assets/datasources.js). The functions below are its python counterparts, used where the browser is emulated
+"""
+import ast
+import operator
+import re
+from dash.exceptions import PreventUpdate
+
+_OPERATORS = {
+    ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=', ast.In: 'in',
+    ast.NotIn: 'not in'
+}
+_COMPARISONS = {
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge
+}
+
+
+def _predicate(node) -> list:
+    if not isinstance(node, ast.Compare) or len(node.ops) != 1 or not isinstance(node.left, ast.Name):
+        raise ValueError
+    return [node.left.id, _OPERATORS[type(node.ops[0])], ast.literal_eval(node.comparators[0])]
+
+
+def _predicates(node) -> list:
+    if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+        return [predicate for value in node.values for predicate in _predicates(value)]
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd):
+        return _predicates(node.left) + _predicates(node.right)
+    return [_predicate(node)]
+
+
+def predicates(expression: str) -> list:
+    """
+    [column, operator, value] predicates of a query expression made of comparisons of a column with a literal joined
+    by and (&). Raises ValueError for the other expressions
+    """
+    if not expression:
+        return []
+    try:
+        return _predicates(ast.parse(expression, mode='eval').body)
+    except (SyntaxError, ValueError, KeyError):
+        raise ValueError(f'''
+            Expression {expression} can't be evaluated in the browser.
+            Only comparisons of a column with a value joined by and (&) are supported.
+        ''')
+
+
+def expression_columns(expression: str) -> set:
+    """
+    Names an expression refers to as columns, the names compared with values, their methods and the backtick quoted
+    ones. The function names of the calls aren't columns
+    """
+    columns = set(re.findall(r'`([^`]*)`', expression or ''))
+    try:
+        tree = ast.parse(re.sub(r'`[^`]*`', '0', expression or ''), mode='eval')
+    except SyntaxError:
+        return columns
+    functions = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    return columns | {node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and id(node) not in functions}
+
+
+def _matches(value, comparison: str, target) -> bool:
+    if comparison in ('in', 'not in'):
+        return (value in target) == (comparison == 'in')
+    if value is None or target is None:
+        return comparison == '!=' and value is not target
+    return _COMPARISONS[comparison](value, target)
+
+
+def filter_predicates(filters: dict) -> list:
+    """ Predicates of the filter values of a datasource ({column: [filter_type, value]}) """
+    result = []
+    for column, (filter_type, value) in filters.items():
+        if filter_type == 'checkbox':
+            result.append([column, 'in', value or []])
+        elif filter_type == 'radio':
+            result.append([column, '==', value])
+        else:
+            result.extend([[column, '>=', value[0]], [column, '<=', value[1]]])
+    return result
+
+
+def stale(timestamp, version: str, data: dict) -> str:
+    """ datasources.stale of assets/datasources.js, requests the payload unless the stored one has the version """
+    if data and data.get('version') == version:
+        raise PreventUpdate
+    return version
+
+
+def filter_rows(filterpanel_values: dict, payload: dict, config: dict) -> dict:
+    """ datasources.filter of assets/datasources.js, the rows of the payload passing the filters and parameters """
+    if not filterpanel_values or not payload or not config:
+        raise PreventUpdate
+    selected = filter_predicates(filterpanel_values.get('filters', {}).get(config['datasource'], {}))
+    for parameter, options in config['parameters'].items():
+        selected.extend(options.get(filterpanel_values.get('parameters', {}).get(parameter), []))
+    columns = payload['columns']
+    tests = [(payload['values'][columns.index(column)], comparison, target) for column, comparison, target in selected]
+    rows = [
+        row for row in range(len(payload['values'][0]) if columns else 0)
+        if all(_matches(values[row], comparison, target) for values, comparison, target in tests)
+    ]
+    return {**config, 'version': payload['version'], 'columns': columns,
+            'values': [[values[row] for row in rows] for values in payload['values']]}
+
+
+def rows_table(rows: dict) -> list:
+    """ datasources.table of assets/datasources.js, the columns and the records of the rows store """
+    if not rows or 'columns' not in rows:
+        raise PreventUpdate
+    columns = [{'name': column, 'id': column} for column in rows['columns']]
+    return [columns, [dict(zip(rows['columns'], row)) for row in zip(*rows['values'])]]
@@ -29,7 +29,8 @@ MODEBAR_BUTTONS = [
 
 META_BUTTONS = {
     'info': "ri:file-info-line",
-    'data_table': "dashicons:editor-table"
+    'data_table': "dashicons:editor-table",
+    'export': "ri:download-2-line"
 }
 
 DASHBOARDS_DIR = 'dashboards'
@@ -48,6 +49,9 @@ ABOUT_TXT = (
 
 IGNORED = ['__pycache__']
 
+# Window components with dict ids served by the pattern-matching callback families
+FAMILY_COMPONENTS = ['filterpanel_values_store', 'table_store']
+
 TABLE_STYLE_CELL = {
     'padding': '5px',
     'backgroundColor': '#1f2326',
@@ -63,4 +67,60 @@ TABLE_STYLE_HEADER = {
     'fontWeight': 'bold',
     'fontFamily': "TT Octosquares Condensed",
     'border': '1px solid #14141e'
-}
\ No newline at end of file
+}
+
+SERVER_STORE_SIZE = 256
+TABLE_PAGE_SIZE = 25
+
+LOD_MAX_POINTS = 5000
+PYRAMID_GRAINS = ['D', 'W', 'M', 'Q', 'Y']
+# Time pyramids kept by datasource, by columns, aggregation and where expression
+PYRAMID_CACHE_SIZE = 32
+
+METRICS_ROUTE = '/metrics'
+LATENCY_BUCKETS = [.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10]
+SIZE_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+
+PROFILER_ROUTE = '/_profiler'
+PROFILER_TOKEN_ENV = 'DASH_PROFILER_TOKEN'
+PROFILER_SAMPLE_INTERVAL = .001
+
+RECORDER_PATH_ENV = 'DASH_RECORD_PATH'
+RECORDER_SAMPLE_ENV = 'DASH_RECORD_SAMPLE'
+
+LAZY_MAX_DASHBOARDS = 32
+
+PAGE_CACHE_SIZE = 256
+
+DISPATCH_WORKERS = 8
+DISPATCH_QUEUE_LENGTH = 4
+DISPATCH_QUEUE_TIMEOUT = 30
+DISPATCH_BASE_PORT = 8101
+
+PIVOT_AGGREGATIONS = ['sum', 'count', 'mean', 'min', 'max', 'cumsum']
+# Column header levels of the pivot periods by time grain
+PIVOT_HEADERS = {'D': ['%Y', '%b %d'], 'W': ['%Y', 'W%W'], 'M': ['%Y', '%b'], 'Q': ['%Y', 'Q%q'], 'Y': ['%Y']}
+# Cells of the largest aggregation cube (a cell takes 16 bytes, 24 with min or max) and the cubes kept by datasource
+CUBE_MAX_CELLS = 2 ** 21
+CUBE_CACHE_SIZE = 8
+
+EXPORT_ROUTE = '/_export'
+EXPORT_FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+EXPORT_CHUNK_ROWS = 50000
+# Secret key signing the export links, the same in every worker of the app
+SECRET_KEY_ENV = 'DASH_SECRET_KEY'
+# Seconds an export link is served after the filters of its window were applied
+EXPORT_LINK_MAX_AGE = 24 * 3600
+
+READY_ROUTE = '/_ready'
+WARMUP_RESULTS_SIZE = 1024
+
+# Rows of the largest datasource sent to the browser for the clientside filtering
+CLIENTSIDE_MAX_ROWS = 50000
+
+ADMISSION_SLOTS = 8
+ADMISSION_UI_RESERVE = 2
+ADMISSION_SESSION_SLOTS = 2
+ADMISSION_QUEUE_LENGTH = 4
+ADMISSION_QUEUE_TIMEOUT = 30
+ADMISSION_COOKIE = 'dash_session'
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+from .constants import PIVOT_AGGREGATIONS, PIVOT_HEADERS, CUBE_MAX_CELLS
+
+
+class Cube:
+    """
+    Aggregation cube of a datasource. The measure is aggregated once into dense arrays over the row dimension, the
+    categorical dimensions and the periods of the time grain. A filter state selects cells along the axes and the pivot
+    is the reduction of the selected cells, so filter changes don't group the raw rows again. A date range is applied
+    by selecting the periods, so it's supported only when it covers the days of the data in every selected period.
+    The cube has at most max_cells cells: the dimensions with the most labels are left out until it fits, so the
+    filters on them aren't supported, and ValueError is raised if the row dimension by the periods doesn't fit
+    """
+
+    def __init__(self, dataframe: pd.DataFrame, rows: str, date_column: str, measure: str, agg: str = 'sum',
+                 dimensions: list = None, grain: str = 'M', max_cells: int = CUBE_MAX_CELLS):
+        if agg not in PIVOT_AGGREGATIONS:
+            raise ValueError(f'''
+                Aggregation {agg} is not supported. Supported aggregations are: {PIVOT_AGGREGATIONS}
+            ''')
+        self.rows = rows
+        self.date_column = date_column
+        self.measure = measure
+        self.agg = agg
+        self.grain = grain
+        self.dimensions = [rows] + [d for d in (dimensions or []) if d not in (rows, date_column)]
+
+        self.labels, codes = [], []
+        for dimension in self.dimensions:
+            dimension_codes, labels = pd.factorize(dataframe[dimension], sort=True)
+            self.labels.append(np.asarray(labels))
+            codes.append(dimension_codes)
+        days = pd.to_datetime(dataframe[date_column]).values.astype('datetime64[D]')
+        self.days, day_codes = np.unique(days, return_inverse=True)
+        # The days are sorted, so are their periods
+        self.day_periods, self.periods = pd.factorize(pd.PeriodIndex(self.days, freq=grain))
+        codes.append(self.day_periods[day_codes])
+
+        while len(self.dimensions) > 1 and np.prod([len(labels) for labels in self.labels] + [len(self.periods)],
+                                                   dtype=float) > max_cells:
+            axis = 1 + int(np.argmax([len(labels) for labels in self.labels[1:]]))
+            del self.dimensions[axis], self.labels[axis], codes[axis]
+        self.shape = tuple(len(labels) for labels in self.labels) + (len(self.periods),)
+        if np.prod(self.shape, dtype=float) > max_cells:
+            raise ValueError(f'''
+                Cube of {self.shape[0]} {rows} values by {self.shape[-1]} periods exceeds {max_cells} cells.
+            ''')
+        cells = np.ravel_multi_index(codes, self.shape) if len(dataframe) else np.array([], dtype=int)
+        size = int(np.prod(self.shape))
+        values = dataframe[measure].to_numpy(dtype=float)
+        self.count = np.bincount(cells, minlength=size).reshape(self.shape)
+        self.sum = np.bincount(cells, weights=values, minlength=size).reshape(self.shape)
+        if agg in ('min', 'max'):
+            ufunc = np.fmin if agg == 'min' else np.fmax
+            extreme = np.full(size, np.nan)
+            ufunc.at(extreme, cells, values)
+            self.extreme = extreme.reshape(self.shape)
+
+    def _selected_days(self, value: list) -> np.ndarray:
+        start, end = np.datetime64(str(value[0])[:10]), np.datetime64(str(value[1])[:10])
+        return (self.days >= start) & (self.days <= end)
+
+    def supports(self, filters: dict) -> bool:
+        """ Whether every filter of the datasource can be applied by slicing the cube """
+        for column, (filter_type, value) in filters.items():
+            if column == self.date_column:
+                if filter_type != 'daterange':
+                    return False
+                selected = self._selected_days(value)
+                if not np.array_equal(np.isin(self.day_periods, self.day_periods[selected]), selected):
+                    return False
+            elif column not in self.dimensions or filter_type not in ('checkbox', 'radio'):
+                return False
+        return True
+
+    def _selection(self, filters: dict) -> list:
+        selection = [slice(None)] * len(self.shape)
+        for column, (filter_type, value) in filters.items():
+            if column == self.date_column:
+                selection[-1] = np.unique(self.day_periods[self._selected_days(value)])
+            else:
+                axis = self.dimensions.index(column)
+                values = value if isinstance(value, list) else [value]
+                selection[axis] = np.flatnonzero(np.isin(self.labels[axis], values))
+        return selection
+
+    @staticmethod
+    def _take(array: np.ndarray, selection: list) -> np.ndarray:
+        for axis, selected in enumerate(selection):
+            if not isinstance(selected, slice):
+                array = np.take(array, selected, axis=axis)
+        return array[tuple(s if isinstance(s, slice) else slice(None) for s in selection)]
+
+    def pivot(self, filters: dict = None) -> pd.DataFrame:
+        """
+        Row dimension by period pivot of the selected cells. Cells without rows are NaN, the rows and the periods
+        without any data are dropped like pivot_table does. cumsum is the running total of the period sums
+        """
+        selection = self._selection(filters or {})
+        other_axes = tuple(range(1, len(self.shape) - 1))
+        count = self._take(self.count, selection).sum(axis=other_axes)
+        if self.agg in ('min', 'max'):
+            reduce = np.fmin if self.agg == 'min' else np.fmax
+            values = reduce.reduce(self._take(self.extreme, selection), axis=other_axes)
+        else:
+            values = self._take(self.sum, selection).sum(axis=other_axes)
+
+        if self.agg == 'count':
+            values = count.astype(float)
+        elif self.agg == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = values / count
+        elif self.agg == 'cumsum':
+            values = np.cumsum(values, axis=1)
+        values = np.where(count > 0, values, np.nan)
+
+        periods = self.periods[selection[-1]]
+        headers = [[period.strftime(header) for period in periods] for header in PIVOT_HEADERS[self.grain]]
+        rows = self.labels[0][selection[0]]
+        pivot = pd.DataFrame(values, index=pd.Index(rows, name=self.rows),
+                             columns=pd.MultiIndex.from_arrays(headers))
+        return pivot.loc[count.any(axis=1), count.any(axis=0)]
+
+
+def grouped_pivot(dataframe: pd.DataFrame, rows: str, date_column: str, measure: str, agg: str = 'sum',
+                  grain: str = 'M') -> pd.DataFrame:
+    """ Pivot of the rows like Cube.pivot grouping them by the row dimension and the period, for the cubes too large """
+    periods = pd.to_datetime(dataframe[date_column]).dt.to_period(grain)
+    grouped = dataframe[measure].astype(float).groupby([dataframe[rows], periods])
+    count = grouped.size().unstack()
+    if agg == 'count':
+        values = count.astype(float)
+    else:
+        values = grouped.agg('sum' if agg == 'cumsum' else agg).unstack()
+        if agg == 'cumsum':
+            values = values.cumsum(axis=1)
+    values = values.where(count > 0)
+    values.columns = pd.MultiIndex.from_arrays(
+        [[period.strftime(header) for period in values.columns] for header in PIVOT_HEADERS[grain]]
+    )
+    values.index.name = rows
+    return values
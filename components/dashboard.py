@@ -1,24 +1,32 @@
 from os import path
-from dash import Dash, html, dcc, callback_context as ctx
+from dash import Dash, html, dcc, ClientsideFunction
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 try:
     from typing import Literal
 except ImportError:
     from typing_extensions import Literal
-from .funcs import get_clear_args, to_dependencies
+from .funcs import get_clear_args, to_dependencies, apply_output_hooks, family_id
 from .filter import Filter
 from .parameter import Parameter
 from .window import Window
 from .datasource import DataSource
 from .application import App
+from .constants import LOD_MAX_POINTS, PIVOT_HEADERS, PIVOT_AGGREGATIONS, EXPORT_FORMATS
+from .cube import Cube, grouped_pivot
+from .tables import table_columns
+from .clientside import predicates, expression_columns
+from .pyramid import zoom_aware
+from .families import dashboards
 from inspect import stack
+import pandas as pd
 
 
 
 class Dashboard:
     def __init__(self, datasource_objs: list, overview_text: str = None, name: str = None):
         self.dashboard_path = stack()[1][1]
+        self.module_mtime = path.getmtime(self.dashboard_path) if path.isfile(self.dashboard_path) else 0
         self.id = path.basename(self.dashboard_path).split('.')[0]
         self._set_id_prefix()
         self._set_url()
@@ -31,12 +39,11 @@ class Dashboard:
         self.window_objs = {}
 
         self.dashboard_div = None
-        self.filterpanel_values_callbacks = None
+        self.filterpanel_comp = None
+        self.callback_specs = []
         self.windows_callbacks = []
 
         self._set_overview_modal(overview_text)
-        self._apply_button()
-        self._filterpanel()
 
         self.app = None
 
@@ -68,7 +75,7 @@ class Dashboard:
         self.overview_modal = overview_modal
 
     def _apply_button(self) -> None:
-        self.apply_button_id = f"{self.id_prefix}-apply_filters_button"
+        self.apply_button_id = family_id('apply_filters_button', self.id_prefix)
         self.apply_button_comp = html.Button(
             children=[
                 html.Span('APPLY FILTERS', className='apply-filters-text', n_clicks=0, id=self.apply_button_id),
@@ -88,71 +95,110 @@ class Dashboard:
             className='collapsed'
         )
 
-    def _callback_filterpanel_values(self) -> None:
-        if len(self.window_objs.keys()) >= 1:
-            callbacks_dicts = []
-
-            def filterpanel_values(*args):
-                filters_vals_dict = {}
-                for k, v in ctx.states.items():
-                    key = k.split('.')[0]
-                    if key not in filters_vals_dict.keys():
-                        filters_vals_dict[key] = v
-                    else:
-                        filters_vals_dict[key] = [filters_vals_dict[key], v]
-
-                parameters_vals_dict = {
-                    k.split('.')[0].split('-')[-1]: v for k, v in ctx.states.items() if 'parameter' in k
-                }
-                query_parts = {ds_id: [] for ds_id in self.datasource_objs.keys()}
-                for k, v in filters_vals_dict.items():
-                    for component_id, obj in self.filter_objs.items():
-                        if k == component_id and \
-                                (window_obj.id in obj.target_windows or obj.target_windows == []):
-                            if '==' in obj.query_expression and isinstance(v, str):
-                                v = f'"{v}"'
-                            query_parts[obj.datasource_id].append(obj.query_expression.format(value=v))
-                query_expressions = {ds_id: ' & '.join(parts) for ds_id, parts in query_parts.items()}
-                return {'query_expressions': query_expressions, 'parameters': parameters_vals_dict}
-
-            for window_obj in self.window_objs.values():
-                store = window_obj.filterpanel_values_store_id
-                states = []
-                for filter_obj in self.filter_objs.values():
-                    if filter_obj.filter_type != 'daterange':
-                        states.append((filter_obj.component_id, 'value'))
-                    else:
-                        states.append((filter_obj.component_id, 'start_date'))
-                        states.append((filter_obj.component_id, 'end_date'))
-                for param_obj in self.parameter_objs.values():
-                    states.append((param_obj.component_id, 'value'))
-                callbacks_dicts.append(
-                    {
-                        'outputs': [(store, 'data')],
-                        'inputs': [(self.apply_button_id, 'n_clicks')],
-                        'states': states,
-                        'func': filterpanel_values,
-                        'initial_call': True,
-                    }
-                )
-            self.filterpanel_values_callbacks = callbacks_dicts
-        else:
-            pass
+    def filterpanel_state(self, states: dict, window_id) -> dict:
+        """
+        Builds the filter panel state of the window (query expressions per datasource and parameter values) from the
+        values of filter panel components given in callback context states format ({'component_id.prop': value}).
+        The filter values are also kept by datasource and column for the windows slicing precomputed data
+        """
+        filters_vals_dict = {}
+        for k, v in states.items():
+            key = k.split('.')[0]
+            if key not in filters_vals_dict.keys():
+                filters_vals_dict[key] = v
+            else:
+                filters_vals_dict[key] = [filters_vals_dict[key], v]
+
+        parameters_vals_dict = {
+            k.split('.')[0].split('-')[-1]: v for k, v in states.items() if 'parameter' in k
+        }
+        query_parts = {ds_id: [] for ds_id in self.datasource_objs.keys()}
+        filters = {ds_id: {} for ds_id in self.datasource_objs.keys()}
+        for k, v in filters_vals_dict.items():
+            for component_id, obj in self.filter_objs.items():
+                if k == component_id and (window_id in obj.target_windows or obj.target_windows == []):
+                    filters[obj.datasource_id][obj.source_column] = [obj.filter_type, v]
+                    if '==' in obj.query_expression and isinstance(v, str):
+                        v = f'"{v}"'
+                    query_parts[obj.datasource_id].append(obj.query_expression.format(value=v))
+        query_expressions = {ds_id: ' & '.join(parts) for ds_id, parts in query_parts.items()}
+        return {'query_expressions': query_expressions, 'parameters': parameters_vals_dict, 'filters': filters}
+
+    def default_filterpanel_states(self) -> dict:
+        """ Filter panel component values before any user interaction in callback context states format """
+        states = {}
+        for filter_obj in self.filter_objs.values():
+            if filter_obj.filter_type != 'daterange':
+                states[f'{filter_obj.component_id}.value'] = filter_obj.default_value
+            else:
+                states[f'{filter_obj.component_id}.start_date'] = filter_obj.default_value[0]
+                states[f'{filter_obj.component_id}.end_date'] = filter_obj.default_value[1]
+        for param_obj in self.parameter_objs.values():
+            states[f'{param_obj.component_id}.value'] = param_obj.default_value
+        return states
+
+    def _output_hooks(self, outputs: dict) -> list:
+        return [
+            self.window_objs[window_id].output_hooks.get(component) if window_id in self.window_objs else None
+            for window_id, components in outputs.items() for component in components
+        ]
+
+    def _output_targets(self, outputs: dict) -> dict:
+        """ Outputs redirected by the windows to other components, like the table data sent as a columnar payload """
+        return {
+            window_id: [
+                self.window_objs[window_id].output_targets.get(component, component)
+                if window_id in self.window_objs else component
+                for component in components
+            ]
+            for window_id, components in outputs.items()
+        }
 
     def _prepare_window_callbacks(self) -> None:
         window_callbacks = []
-        for cb in self.windows_callbacks:
+        for cb in self.callback_specs + self._pivot_callbacks() + self._clientside_callbacks():
+            cb = dict(cb)
+            # Output hooks and targets are applied on the server, the clientside functions set the outputs as they are
+            clientside = isinstance(cb['func'], ClientsideFunction)
+            zoom_windows = [
+                self.window_objs[window_id] for window_id, components in cb['outputs'].items()
+                if 'graph.figure' in components and window_id in self.window_objs
+                and self.window_objs[window_id].zoom_lod and not clientside
+            ]
+            if zoom_windows:
+                cb['func'] = zoom_aware(cb['func'])
+            if not clientside:
+                cb['func'] = apply_output_hooks(cb['func'], self._output_hooks(cb['outputs']))
+                cb['outputs'] = self._output_targets(cb['outputs'])
             cb['outputs'] = to_dependencies(self.id_prefix, cb['outputs'])
             cb['inputs'] = to_dependencies(self.id_prefix, cb['inputs'])
+            if zoom_windows:
+                cb['inputs'].append((zoom_windows[0].graph_id, 'relayoutData'))
             if cb['states']:
                 cb['states'] = to_dependencies(self.id_prefix, cb['states'])
             window_callbacks.append(cb)
         self.windows_callbacks = window_callbacks
 
+    def _datasource_stores(self) -> list:
+        """
+        Stores of the clientside datasources used by the windows. The columnar copy is kept in the local storage and
+        requested from the server only when its version differs from the current one (see families.py)
+        """
+        stores = []
+        for datasource_id in dict.fromkeys(w.clientside for w in self.window_objs.values() if w.clientside):
+            stores.extend([
+                dcc.Store(id=family_id('datasource_store', self.id_prefix, datasource=datasource_id),
+                          storage_type='local'),
+                dcc.Store(id=family_id('datasource_version', self.id_prefix, datasource=datasource_id),
+                          data=self.datasource_objs[datasource_id].version),
+                dcc.Store(id=family_id('datasource_request', self.id_prefix, datasource=datasource_id)),
+            ])
+        return stores
+
     def _dashboard(self) -> None:
         self.dashboard_div = html.Div(
             id=self.id_prefix,
-            children=[window_obj.window_comp for window_obj in self.window_objs.values()],
+            children=[window_obj.window_comp for window_obj in self.window_objs.values()] + self._datasource_stores(),
             className='dashboard-div'
         )
 
@@ -165,26 +211,192 @@ class Dashboard:
             **get_clear_args(locals())
         )
         self.filter_objs[filter_obj.component_id] = filter_obj
-        self._filterpanel()
-        self._callback_filterpanel_values()
 
     def add_parameter(self, name: str, options: dict, default_value,
                       parameter_type: Literal['negative_positive'] = 'negative_positive') -> None:
         parameter_obj = Parameter(dashboard_id=self.id, **get_clear_args(locals()))
         self.parameter_objs[parameter_obj.component_id] = parameter_obj
-        self._filterpanel()
-        self._callback_filterpanel_values()
 
     def add_window(self, window_id: int, name: str, row_start: int, row_end: int, col_start: int, col_end: int,
                    remove_buttons: list = None, layout: dict = None, info: str = None,
-                   table_feature: bool = False, content_type: Literal['graph', 'table'] = 'graph') -> None:
+                   table_feature: bool = False, content_type: Literal['graph', 'table', 'pivot'] = 'graph',
+                   table_store: Literal['client', 'server'] = 'client', max_points: int = LOD_MAX_POINTS,
+                   webgl: bool = True, drop_text: bool = True, zoom_lod: bool = False,
+                   table_transport: Literal['records', 'columnar'] = 'records', pivot: dict = None,
+                   export: dict = None, selection_key: str = None, clientside: str = None) -> None:
+        """
+        A pivot window is declared with pivot={'datasource', 'rows', 'date', 'measure', 'grain', 'agg'} (grain and agg
+        default to 'M' and 'sum'). Unless a callback is set for its table, the pivot is shown as is.
+
+        export={'datasource', 'format', 'join', 'parameters'} adds a link downloading the rows of the datasource
+        passing the filters of the window as CSV or Parquet (format defaults to 'csv'). The columns of the related
+        datasources are joined by join ({dimension_id: [columns]}) and the expressions of the parameters listed by type
+        in parameters are applied like the window functions apply them.
+
+        A table window with selection_key publishes the values of that column in the selected rows as
+        'selection.data', the input the windows depending on the selection should use.
+
+        A window with clientside=datasource_id filters the columnar copy of that datasource (declared with
+        clientside=True) in the browser and gets the rows passing its filters as 'rows.data' ({'columns', 'values'}).
+        Only the filters of that datasource and the parameters whose options compare its columns are applied. Its
+        callbacks can be clientside (func=ClientsideFunction) and a table window without a callback for its table
+        shows the rows as they are
+        """
+        if content_type == 'pivot':
+            pivot = self._validate_pivot(pivot)
+        if export:
+            export = self._validate_export(export)
+        if clientside:
+            self._validate_clientside(clientside)
         window_obj = Window(dashboard_id=self.id, **get_clear_args(locals()))
         self.window_objs[window_id] = window_obj
-        self._dashboard()
-        self._callback_filterpanel_values()
+
+    def _validate_pivot(self, pivot: dict) -> dict:
+        pivot = {'grain': 'M', 'agg': 'sum', **(pivot if pivot else {})}
+        missing = {'datasource', 'rows', 'date', 'measure'} - pivot.keys()
+        if missing:
+            raise ValueError(f'''
+                Pivot window needs {missing} to be specified.
+            ''')
+        if pivot['datasource'] not in self.datasource_objs:
+            raise ValueError(f'''
+                There is no datasource {pivot['datasource']} in the dashboard.
+                Dashboard datasources are {list(self.datasource_objs.keys())}
+            ''')
+        if pivot['grain'] not in PIVOT_HEADERS or pivot['agg'] not in PIVOT_AGGREGATIONS:
+            raise ValueError(f'''
+                Pivot grain should be one of {list(PIVOT_HEADERS.keys())} and aggregation one of {PIVOT_AGGREGATIONS}.
+                You've specified {pivot['grain']} and {pivot['agg']}
+            ''')
+        return pivot
+
+    def _validate_export(self, export: dict) -> dict:
+        export = {'format': 'csv', 'join': {}, 'parameters': [], **export}
+        datasource_obj = self.datasource_objs.get(export.get('datasource'))
+        if datasource_obj is None:
+            raise ValueError(f'''
+                Export datasource should be one of the dashboard datasources {list(self.datasource_objs.keys())}.
+                You've specified {export.get('datasource')}
+            ''')
+        if export['format'] not in EXPORT_FORMATS:
+            raise ValueError(f'''
+                Export format should be one of {list(EXPORT_FORMATS.keys())}. You've specified {export['format']}
+            ''')
+        for dimension_id in export['join']:
+            datasource_obj._relationship(dimension_id)
+        return export
+
+    def _validate_clientside(self, datasource_id: str) -> None:
+        datasource_obj = self.datasource_objs.get(datasource_id)
+        if datasource_obj is None or not datasource_obj.clientside:
+            raise ValueError(f'''
+                Clientside window datasource should be one of the dashboard datasources declared with clientside=True.
+                You've specified {datasource_id}
+            ''')
+
+    def _clientside_parameters(self, datasource_id: str) -> dict:
+        """
+        Predicates of the options of the parameters comparing the columns of the datasource by parameter type. The
+        parameters with expressions the browser can't evaluate are skipped unless all their columns are of the
+        datasource
+        """
+        columns = set(self.datasource_objs[datasource_id].payload()['columns'])
+        parameters = {}
+        for param_obj in self.parameter_objs.values():
+            try:
+                options = {option['value']: predicates(option['value']) for option in param_obj.options}
+            except ValueError:
+                used = {column for option in param_obj.options for column in expression_columns(option['value'])}
+                if used and used <= columns:
+                    raise
+                continue
+            used = {column for option in options.values() for column, _, _ in option}
+            if used and used <= columns:
+                parameters[param_obj.parameter_type] = options
+        return parameters
+
+    def pivot(self, window_id: int, filterpanel_values: dict, where: str = None) -> pd.DataFrame:
+        """
+        Pivot of the window for the filter panel state. The cube of the datasource is built at the grain of the window
+        once per datasource version and where expression, the filters slice it. The filters of the dimension
+        datasources related by the row dimension select the rows. If a filter of the datasource isn't a cube dimension
+        (an interval filter, a daterange on another column or one cutting a period), the pivot is built from the
+        filtered rows instead. The rows are grouped if the
+        cube of the datasource is too large (see Cube)
+        """
+        spec = self.window_objs[window_id].pivot
+        datasource_obj = self.datasource_objs[spec['datasource']]
+        query_expressions = filterpanel_values['query_expressions']
+        filters = dict(filterpanel_values.get('filters', {}).get(spec['datasource'], {}))
+        related = {
+            dimension_id: query_expressions.get(dimension_id)
+            for dimension_id in datasource_obj.relationships.keys() if query_expressions.get(dimension_id)
+        }
+        for dimension_id, dimension_query in related.items():
+            relationship = datasource_obj.relationships[dimension_id]
+            if relationship.on == spec['rows'] and spec['rows'] not in filters:
+                dimension = relationship.dimension.dataframe
+                keys = dimension[relationship.key][dimension.eval(dimension_query).to_numpy(dtype=bool)]
+                filters[spec['rows']] = ['checkbox', keys.tolist()]
+        dimensions = [
+            filter_obj.source_column for filter_obj in self.filter_objs.values()
+            if filter_obj.datasource_id == spec['datasource'] and filter_obj.filter_type in ('checkbox', 'radio')
+        ]
+        cube = datasource_obj.cube(spec['rows'], spec['date'], spec['measure'], spec['agg'], dimensions, where,
+                                   spec['grain'])
+        if cube is None or not cube.supports(filters):
+            query = ' & '.join(part for part in [query_expressions[spec['datasource']], where] if part)
+            dataframe = datasource_obj.select(query, related=related)
+            if cube is None:
+                return grouped_pivot(dataframe, spec['rows'], spec['date'], spec['measure'], spec['agg'],
+                                     spec['grain']).reset_index()
+            cube = Cube(dataframe, spec['rows'], spec['date'], spec['measure'], spec['agg'], grain=spec['grain'])
+            filters = {}
+        return cube.pivot(filters).reset_index()
+
+    def _table_outputs(self) -> set:
+        """ Windows whose table is an output of the callbacks set """
+        return {
+            window_id for cb in self.callback_specs for window_id, components in cb['outputs'].items()
+            if 'table.data' in components
+        }
+
+    def _pivot_callbacks(self) -> list:
+        """ Default callbacks of the pivot windows whose table isn't an output of the callbacks set """
+        outputs = self._table_outputs()
+        callbacks = []
+        for window_id, window_obj in self.window_objs.items():
+            if window_obj.content_type == 'pivot' and window_id not in outputs:
+                def show_pivot(filterpanel_values, window_id=window_id):
+                    pivot = self.pivot(window_id, filterpanel_values)
+                    return [table_columns(pivot), pivot]
+
+                callbacks.append({
+                    'outputs': {window_id: ['table.columns', 'table.data']},
+                    'inputs': {window_id: ['filterpanel_values_store.data']},
+                    'states': None,
+                    'func': show_pivot,
+                    'initial_call': False
+                })
+        return callbacks
+
+    def _clientside_callbacks(self) -> list:
+        """ Default callbacks of the clientside table windows showing their rows in the browser """
+        outputs = self._table_outputs()
+        return [
+            {
+                'outputs': {window_id: ['table.columns', 'table.data']},
+                'inputs': {window_id: ['rows.data']},
+                'states': None,
+                'func': ClientsideFunction('datasources', 'table'),
+                'initial_call': False
+            }
+            for window_id, window_obj in self.window_objs.items()
+            if window_obj.clientside and window_obj.content_type == 'table' and window_id not in outputs
+        ]
 
     def set_callback(self, func, outputs: dict, inputs: dict, states: dict = None, initial_call: bool = False) -> None:
-        self.windows_callbacks.append(
+        self.callback_specs.append(
             {
                 'outputs': outputs,
                 'inputs': inputs,
@@ -194,29 +406,40 @@ class Dashboard:
             }
         )
 
-    def update_dashboard(self, project_id: str, project_url: str) -> None:
+    def finalize(self, project_id: str = None, project_url: str = None) -> None:
+        """
+        Builds the components of the windows, filters and parameters, the filter panel, the dashboard div and the
+        window callback specs in a single pass with the final ids. The add_* and set_callback methods only record
+        the dashboard content, so the assembly doesn't grow quadratically with it
+        """
         self._set_id_prefix(project_id)
         self._set_url(project_url)
 
         for window_obj in self.window_objs.values():
-            window_obj.update_ids(project_id)
+            if window_obj.clientside:
+                window_obj.clientside_parameters = self._clientside_parameters(window_obj.clientside)
+            window_obj.build(project_id)
         for filter_obj in self.filter_objs.values():
-            filter_obj.update_ids(project_id)
+            filter_obj.build(project_id)
         for parameter_obj in self.parameter_objs.values():
-            parameter_obj.update_ids(project_id)
+            parameter_obj.build(project_id)
 
         self.filter_objs = {filter_obj.component_id: filter_obj for filter_obj in self.filter_objs.values()}
+        self.parameter_objs = {param_obj.component_id: param_obj for param_obj in self.parameter_objs.values()}
 
         self._apply_button()
         self._filterpanel()
         self._dashboard()
         self._prepare_window_callbacks()
-        self._callback_filterpanel_values()
+        dashboards[self.id_prefix] = self
+
+    def update_dashboard(self, project_id: str, project_url: str) -> None:
+        self.finalize(project_id, project_url)
 
     def init_app(self):
-        self._prepare_window_callbacks()
+        self.finalize()
 
-        callbacks = self.filterpanel_values_callbacks + self.windows_callbacks
+        callbacks = list(self.windows_callbacks)
         for window_obj in self.window_objs.values():
             callbacks.extend(window_obj.callbacks)
         for filter_obj in self.filter_objs.values():
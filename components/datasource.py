@@ -1,32 +1,115 @@
-from os.path import dirname, join, isfile, split
+from os import register_at_fork, getpid
+from os.path import dirname, join, isfile, split, getmtime, getsize
 from inspect import stack
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+from .pyramid import TimePyramid
+from .cube import Cube
+from .store import LRUCache
+from .relationship import Relationship
+from .tables import column_values
+from .constants import EXPORT_CHUNK_ROWS, CLIENTSIDE_MAX_ROWS, CUBE_CACHE_SIZE, PYRAMID_CACHE_SIZE
+
+_read_pool = None
+
+
+def _new_read_pool() -> None:
+    """
+    pyarrow and the C parser of pandas release the GIL for most of the read, so the files are read concurrently.
+    A forked process (gunicorn --preload) inherits the pool without its threads, so it gets a new one
+    """
+    global _read_pool
+    _read_pool = ThreadPoolExecutor(thread_name_prefix='datasource')
+
+
+_new_read_pool()
+register_at_fork(after_in_child=_new_read_pool)
+
+
+def file_version(path: str) -> str:
+    return f"{getmtime(path):.0f}-{getsize(path)}"
 
 
 class DataSource:
-    def __init__(self, filename: str, filter_columns: dict, rename_cols: dict = None, sep=None, set_date_columns: dict = None):
+    """
+    The file is read on a thread pool, so the datasources defined one after another are read concurrently.
+    The first access to the dataframe or the columns config waits for the read and raises its error if it failed.
+    A datasource with clientside=True can be filtered in the browser by the windows declared clientside (see
+    clientside.py), it's sent there as a columnar payload once per version
+    """
+
+    def __init__(self, filename: str, filter_columns: dict, rename_cols: dict = None, sep=None, set_date_columns: dict = None,
+                 data_dir: str = None, clientside: bool = False):
         self.id, self.extension = filename.split('.')
         self.root_dir = dirname(dirname(__file__))
-        self.path = join(self.root_dir, split(stack()[1][1])[0], 'data', filename)
+        if data_dir:
+            self.path = join(data_dir, filename)
+        else:
+            self.path = join(self.root_dir, split(stack()[1][1])[0], 'data', filename)
         self.read_args = {}
         if sep:
             self.read_args['sep'] = sep
-        self.dataframe = self._read_data()
+        self.reader = self._get_reader()
+        self.version = file_version(self.path)
+        self._pyramids = LRUCache(PYRAMID_CACHE_SIZE)
+        self._cubes = LRUCache(CUBE_CACHE_SIZE)
+        self.relationships = {}
+        self.clientside = clientside
+        self._payload = (None, None)
+        self._dataframe = None
+        self._columns_config = None
+        self.options_version = 0
+        self._load_args = (filter_columns, rename_cols, set_date_columns)
+        self._loading_pid = getpid()
+        self._loading = _read_pool.submit(self._load, *self._load_args)
+
+    def _load(self, filter_columns: dict, rename_cols: dict = None, set_date_columns: dict = None) -> None:
+        dataframe = self.reader(self.path, **self.read_args)
         if rename_cols:
-            self.dataframe.rename(columns=rename_cols, inplace=True)
+            dataframe.rename(columns=rename_cols, inplace=True)
         if set_date_columns:
             for col, dt_format in set_date_columns.items():
-                self.dataframe[col] = pd.to_datetime(self.dataframe[col], format=dt_format).dt.strftime('%Y-%m-%d')
-        self.columns_config = self._set_columns_config(filter_columns)
+                dataframe[col] = pd.to_datetime(dataframe[col], format=dt_format).dt.strftime('%Y-%m-%d')
+        self._dataframe = dataframe
+        self._columns_config = self._set_columns_config(filter_columns)
+
+    def wait(self):
+        """ Waits until the file is read and processed, a read unfinished at a fork is done again in the child """
+        loading = self._loading
+        if loading is not None:
+            if self._loading_pid != getpid() and not loading.done():
+                self._load(*self._load_args)
+            else:
+                loading.result()
+            self._loading = None
+        return self
+
+    @property
+    def dataframe(self) -> pd.DataFrame:
+        return self.wait()._dataframe
+
+    @dataframe.setter
+    def dataframe(self, dataframe: pd.DataFrame) -> None:
+        self.wait()._dataframe = dataframe
 
-    def _read_data(self) -> pd.DataFrame:
+    @property
+    def columns_config(self) -> dict:
+        return self.wait()._columns_config
+
+    @columns_config.setter
+    def columns_config(self, columns_config: dict) -> None:
+        self.wait()._columns_config = columns_config
+        self.options_version += 1
+
+    def _get_reader(self):
         supported_extensions = {'csv': pd.read_csv, 'parquet': pd.read_parquet}
         if self.extension in supported_extensions.keys():
             if isfile(self.path):
-                return supported_extensions[self.extension](self.path, **self.read_args)
+                return supported_extensions[self.extension]
             else:
                 raise ValueError(f'''
-                    Given file doesn't exist in datasources directory: {join(self.root_dir, split(stack()[2][1])[0], 'data')}
+                    Given file doesn't exist in datasources directory: {dirname(self.path)}
                 ''')
         else:
             raise TypeError(f'''
@@ -34,10 +117,10 @@ class DataSource:
                 ''')
     
     def _get_column_minmax(self, column):
-        return self.dataframe[column].sort_values().agg(['min', 'max']).tolist()
+        return self._dataframe[column].sort_values().agg(['min', 'max']).tolist()
 
     def _get_column_unique(self, column):
-        return sorted(self.dataframe[column].unique().tolist())
+        return sorted(self._dataframe[column].unique().tolist())
 
     def _set_columns_config(self, columns: dict) -> dict:
         rules = {
@@ -50,8 +133,10 @@ class DataSource:
         if target in self.columns_config.keys():
             if set(config.keys()) == set(self.columns_config[target]):
                 self.columns_config[target] = config
+                self.options_version += 1
             elif set(config.values()) == set(self.columns_config[target]):
                 self.columns_config[target] = {v: k for k, v in config.items()}
+                self.options_version += 1
             else:
                 raise ValueError(f'''
                         Given items do not match with existing unique values of target column. 
@@ -65,3 +150,107 @@ class DataSource:
                     Make sure you use one of the listed columns {self.columns_config.keys()}
                 ''')
 
+    def pyramid(self, date_column: str, value_column: str, group_by: list = None, agg: str = 'sum',
+                where: str = None) -> TimePyramid:
+        """
+        Returns the time pyramid of the datasource built once per datasource version. The optional where expression
+        is applied to the data before the aggregation, so every distinct expression (every option of a parameter
+        passed as where) builds and keeps a pyramid of its own, each one a full pass over the data. Up to
+        PYRAMID_CACHE_SIZE pyramids are kept, the least recently used ones are dropped
+        """
+        key = (self.version, date_column, value_column, tuple(group_by or []), agg, where)
+        pyramid = self._pyramids.get(key)
+        if pyramid is None:
+            dataframe = self.dataframe.query(where) if where else self.dataframe
+            pyramid = TimePyramid(dataframe, date_column, value_column, group_by, agg)
+            self._pyramids.set(key, pyramid)
+        return pyramid
+
+    def cube(self, rows: str, date_column: str, measure: str, agg: str = 'sum', dimensions: list = None,
+             where: str = None, grain: str = 'M'):
+        """
+        Returns the aggregation cube of the datasource built once per datasource version like the time pyramid, None if
+        the cube would be too large. The least recently used cubes are dropped
+        """
+        key = (self.version, rows, date_column, measure, agg, tuple(dimensions or []), where, grain)
+        if key in self._cubes:
+            return self._cubes.get(key)
+        dataframe = self.dataframe.query(where) if where else self.dataframe
+        try:
+            cube = Cube(dataframe, rows, date_column, measure, agg, dimensions, grain)
+        except ValueError:
+            cube = None
+        self._cubes.set(key, cube)
+        return cube
+
+    def payload(self) -> dict:
+        """ Columnar copy of the datasource for the browser, built once per version """
+        cached_version, payload = self._payload
+        if cached_version != self.version:
+            dataframe = self.dataframe
+            if len(dataframe) > CLIENTSIDE_MAX_ROWS:
+                raise ValueError(f'''
+                    Datasource {self.id} has {len(dataframe)} rows, it can't be filtered in the browser.
+                    Datasources with up to {CLIENTSIDE_MAX_ROWS} rows can be declared with clientside=True.
+                ''')
+            payload = {'version': self.version, 'columns': [str(column) for column in dataframe.columns],
+                       'values': column_values(dataframe)}
+            self._payload = (self.version, payload)
+        return payload
+
+    def relate(self, dimension, on: str, key: str = None) -> None:
+        """ Declares the foreign key column of this fact datasource referencing the key of the dimension datasource """
+        self.relationships[dimension.id] = Relationship(self, dimension, on, key)
+
+    def _relationship(self, dimension_id: str) -> Relationship:
+        if dimension_id not in self.relationships:
+            raise ValueError(f'''
+                    Datasource {self.id} isn't related to {dimension_id}.
+                    Related datasources are {list(self.relationships.keys())}
+                ''')
+        return self.relationships[dimension_id]
+
+    def mask(self, query: str = None, related: dict = None, join: dict = None) -> np.ndarray:
+        """
+        Rows of the datasource passing the query and the queries of the related datasources ({dimension_id: query}).
+        Rows without a dimension row are dropped if that dimension is filtered or joined, as an inner merge would do
+        """
+        dataframe = self.dataframe
+        mask = np.ones(len(dataframe), dtype=bool)
+        if query:
+            mask &= dataframe.eval(query).to_numpy(dtype=bool)
+        related = related if related else {}
+        for dimension_id in set(related) | set(join if join else {}):
+            relationship = self._relationship(dimension_id)
+            dimension_query = related.get(dimension_id)
+            dimension_mask = None
+            if dimension_query:
+                dimension_mask = relationship.dimension.dataframe.eval(dimension_query).to_numpy(dtype=bool)
+            mask &= relationship.mask(dimension_mask)
+        return mask
+
+    def _joined(self, selected: pd.DataFrame, join: dict, rows: np.ndarray) -> pd.DataFrame:
+        for dimension_id, columns in join.items():
+            for column in columns:
+                selected[column] = self.relationships[dimension_id].gather(column, rows)
+        return selected
+
+    def select(self, query: str = None, related: dict = None, join: dict = None) -> pd.DataFrame:
+        """
+        Rows of the datasource passing the filters (see mask) with the columns of the related datasources joined
+        ({dimension_id: [columns]})
+        """
+        join = join if join else {}
+        mask = self.mask(query, related, join)
+        return self._joined(self.dataframe[mask].copy(), join, mask)
+
+    def chunks(self, query: str = None, related: dict = None, join: dict = None, chunk_rows: int = EXPORT_CHUNK_ROWS):
+        """
+        Yields the rows select would return by chunks of chunk_rows, only the positions of the selected rows and the
+        current chunk are kept in memory. An empty selection is yielded as one empty chunk with all the columns
+        """
+        join = join if join else {}
+        positions = np.flatnonzero(self.mask(query, related, join))
+        for start in range(0, max(len(positions), 1), chunk_rows):
+            rows = positions[start:start + chunk_rows]
+            yield self._joined(self.dataframe.iloc[rows].copy(), join, rows)
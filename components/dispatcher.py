@@ -0,0 +1,231 @@
+"""
+Dispatcher mode. Every project is assembled as its own Dash app with its own callback registry and mounted under
+the project url, the home page is served by a lazy full mode app that doesn't import any dashboard. Each project app
+serves at most `workers` requests at once and keeps at most `queue_length` of the others waiting, the rest are answered
+with 503 at once, so a hot project takes at most workers + queue_length server threads. With processes=True every
+project app runs in its own process with its own memory limit and the server proxies the project urls to it.
+
+    from components.dispatcher import Dispatcher
+
+    dispatcher = Dispatcher(settings={'test': {'workers': 16, 'queue_length': 8, 'memory_mb': 2048}}, processes=True)
+    server = dispatcher.server
+"""
+import http.client
+from inspect import stack
+from multiprocessing import Process
+from os import path
+from threading import BoundedSemaphore, Lock
+import flask
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.serving import run_simple
+from werkzeug.wsgi import ClosingIterator
+from .application import App
+from .funcs import get_names
+from .constants import DISPATCH_WORKERS, DISPATCH_QUEUE_LENGTH, DISPATCH_QUEUE_TIMEOUT, DISPATCH_BASE_PORT
+try:
+    import resource
+except ImportError:
+    resource = None
+
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailer', 'transfer-encoding',
+    'upgrade'
+}
+
+
+class Bulkhead:
+    """
+    Limits the number of requests a project app serves at once. Up to queue_length others wait for a free worker up to
+    timeout, each one on a server thread, the requests beyond them are rejected at once
+    """
+
+    def __init__(self, app, workers: int = DISPATCH_WORKERS, queue_length: int = DISPATCH_QUEUE_LENGTH,
+                 timeout: float = DISPATCH_QUEUE_TIMEOUT):
+        self.app = app
+        self.workers = BoundedSemaphore(workers)
+        self.queue_length = queue_length
+        self.timeout = timeout
+        self.waiting = 0
+        self._lock = Lock()
+
+    def _acquire(self) -> bool:
+        if self.workers.acquire(blocking=False):
+            return True
+        with self._lock:
+            if self.waiting >= self.queue_length:
+                return False
+            self.waiting += 1
+        try:
+            return self.workers.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def __call__(self, environ, start_response):
+        if not self._acquire():
+            start_response('503 Service Unavailable', [('Content-Type', 'text/plain'), ('Retry-After', '1')])
+            return [b'All workers of the project are busy']
+        try:
+            body = self.app(environ, start_response)
+        except BaseException:
+            self.workers.release()
+            raise
+        return ReleasingBody(body, self.workers.release)
+
+
+class ReleasingBody:
+    """ Response body releasing the worker once it's consumed or closed, streamed bodies keep it until they end """
+
+    def __init__(self, body, release):
+        self.body = body
+        self._release = release
+        self._released = False
+
+    def __iter__(self):
+        try:
+            yield from self.body
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if not self._released:
+            self._released = True
+            if hasattr(self.body, 'close'):
+                self.body.close()
+            self._release()
+
+
+class Proxy:
+    """ Forwards the requests of a project url to the project process, a local stand-in for a reverse proxy """
+
+    def __init__(self, host: str, port: int, timeout: float = DISPATCH_QUEUE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def __call__(self, environ, start_response):
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length) if length else None
+        target = environ.get('PATH_INFO') or '/'
+        if environ.get('QUERY_STRING'):
+            target = f"{target}?{environ['QUERY_STRING']}"
+        headers = {
+            key[5:].replace('_', '-').title(): value for key, value in environ.items()
+            if key.startswith('HTTP_') and key[5:].replace('_', '-').lower() not in HOP_BY_HOP_HEADERS
+        }
+        if environ.get('CONTENT_TYPE'):
+            headers['Content-Type'] = environ['CONTENT_TYPE']
+        headers['X-Forwarded-Prefix'] = environ.get('SCRIPT_NAME', '')
+
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request(environ['REQUEST_METHOD'], target, body, headers)
+            response = connection.getresponse()
+        except OSError:
+            connection.close()
+            start_response('502 Bad Gateway', [('Content-Type', 'text/plain')])
+            return [b'The project process is not available']
+        start_response(
+            f'{response.status} {response.reason}',
+            [(key, value) for key, value in response.getheaders() if key.lower() not in HOP_BY_HOP_HEADERS]
+        )
+        return ClosingIterator(iter(lambda: response.read(65536), b''), connection.close)
+
+
+def project_app(project_id: str, projects_path: str, **app_kwargs) -> App:
+    """ Full mode app of a single project with the Dash requests sent under the project url """
+    app_obj = App(mode='full', projects_to_get=[project_id], projects_path=projects_path,
+                  requests_pathname_prefix=f'/{project_id}/', **app_kwargs)
+
+    @app_obj.server.before_request
+    def project_root():
+        # The project url itself isn't a page of the project app, the projects are listed on the home page
+        if flask.request.path == '/':
+            return flask.redirect('/')
+
+    return app_obj
+
+
+def serve_project(project_id: str, projects_path: str, host: str, port: int, workers: int, queue_length: int,
+                  memory_mb: int or None, app_kwargs: dict) -> None:
+    """ Process target of the processes mode, the memory limit covers the whole address space of the process """
+    if memory_mb and resource is not None:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    server = project_app(project_id, projects_path, **app_kwargs).server
+    server.wsgi_app = Bulkhead(ProxyFix(server.wsgi_app, x_prefix=1), workers, queue_length)
+    run_simple(host, port, server, threaded=True)
+
+
+class Dispatcher:
+    def __init__(self, projects_to_get: list = None, settings: dict = None, processes: bool = False,
+                 host: str = '127.0.0.1', base_port: int = DISPATCH_BASE_PORT, **app_kwargs):
+        """
+        settings sets the workers, queue_length and memory_mb of the projects by project id, memory_mb applies only to
+        the processes mode. In-process, the server needs more threads than workers + queue_length of every project.
+        The project processes are started here, so under a multi-worker WSGI server the dispatcher has to be built once
+        in the master process (gunicorn --preload). With admission every project app gets its own scheduler, the home
+        app is built without it
+        """
+        self.projects_path = path.join(path.split(stack()[1][1])[0], 'projects')
+        self.all_projects = get_names(self.projects_path)
+        self.projects_to_get = projects_to_get if projects_to_get else self.all_projects
+        if not set(self.projects_to_get).issubset(set(self.all_projects)):
+            raise ValueError(f'''
+                    Specified Project doesn't exist.
+                    Projects in projects directory are {self.all_projects}.
+                    You've specified {self.projects_to_get}
+            ''')
+        settings = settings if settings else {}
+        self.settings = {
+            project_id: {
+                'workers': DISPATCH_WORKERS, 'queue_length': DISPATCH_QUEUE_LENGTH, 'memory_mb': None,
+                **settings.get(project_id, {})
+            }
+            for project_id in self.projects_to_get
+        }
+        self.processes = processes
+
+        home_kwargs = {key: value for key, value in app_kwargs.items() if key in ['metrics', 'page_cache']}
+        self.home = App(mode='full', projects_to_get=self.projects_to_get, lazy=True,
+                        projects_path=self.projects_path, **home_kwargs)
+        self.project_apps = {}
+        self.project_processes = {}
+        mounts = {}
+        for port, project_id in enumerate(self.projects_to_get, base_port):
+            project_kwargs = self._project_kwargs(project_id, app_kwargs)
+            workers, queue_length = self.settings[project_id]['workers'], self.settings[project_id]['queue_length']
+            if self.processes:
+                self.project_processes[project_id] = Process(
+                    target=serve_project, name=f'project-{project_id}', daemon=True,
+                    args=(project_id, self.projects_path, host, port, workers, queue_length,
+                          self.settings[project_id]['memory_mb'], project_kwargs)
+                )
+                mounts[f'/{project_id}'] = Proxy(host, port)
+            else:
+                self.project_apps[project_id] = project_app(project_id, self.projects_path, **project_kwargs)
+                mounts[f'/{project_id}'] = Bulkhead(self.project_apps[project_id].server, workers, queue_length)
+        for process in self.project_processes.values():
+            process.start()
+
+        self.server = self.home.server
+        self.server.wsgi_app = DispatcherMiddleware(self.server.wsgi_app, mounts)
+
+    @staticmethod
+    def _project_kwargs(project_id: str, app_kwargs: dict) -> dict:
+        """ App settings of a project app, every project gets its own snapshot file """
+        project_kwargs = dict(app_kwargs)
+        if project_kwargs.get('snapshot'):
+            root, ext = path.splitext(project_kwargs['snapshot'])
+            project_kwargs['snapshot'] = f'{root}.{project_id}{ext}'
+        return project_kwargs
+
+    def stop(self) -> None:
+        for process in self.project_processes.values():
+            process.terminate()
+            process.join()
+
+    def run_app(self):
+        # The reloader would start the project processes a second time
+        self.home.app.run_server(debug=True, use_reloader=not self.processes)
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from plotly.basedatatypes import BaseFigure
+
+POINT_PROPERTIES = ['x', 'y', 'text', 'hovertext', 'customdata', 'ids', 'textposition']
+MARKER_POINT_PROPERTIES = ['color', 'size', 'symbol', 'opacity']
+DOWNSAMPLED_TYPES = ['scatter', 'scattergl']
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the positions of the points that are kept, so the same
+    selection can be applied to every per-point property of a trace
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if next_start >= next_end:
+            next_start, next_end = n - 1, n
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.nan_to_num(areas, nan=-1.).argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def _as_numeric(values) -> np.ndarray:
+    array = np.asarray(values)
+    if array.dtype.kind in 'Mm':
+        return array.astype('datetime64[ns]').astype(np.int64).astype(float)
+    if array.dtype.kind in 'iufb':
+        return array.astype(float)
+    try:
+        return pd.to_datetime(array).values.astype(np.int64).astype(float)
+    except (ValueError, TypeError):
+        return np.arange(len(array), dtype=float)
+
+
+def _take(values, positions: np.ndarray, n: int):
+    if isinstance(values, (list, tuple, np.ndarray, pd.Series, pd.Index)) and len(values) == n:
+        return np.asarray(values)[positions]
+    return values
+
+
+def reduce_trace(trace: dict, max_points: int, webgl: bool = True, drop_text: bool = True) -> dict:
+    """ Reduce a single trace to the point budget if it exceeds it """
+    if trace.get('type', 'scatter') not in DOWNSAMPLED_TYPES or trace.get('x') is None or trace.get('y') is None:
+        return trace
+    n = len(trace['x'])
+    if n <= max_points:
+        return trace
+
+    positions = lttb(_as_numeric(trace['x']), _as_numeric(trace['y']), max_points)
+    reduced = dict(trace)
+    for prop in POINT_PROPERTIES:
+        if prop in reduced:
+            reduced[prop] = _take(reduced[prop], positions, n)
+    if isinstance(reduced.get('marker'), dict):
+        reduced['marker'] = {k: _take(v, positions, n) if k in MARKER_POINT_PROPERTIES else v
+                             for k, v in reduced['marker'].items()}
+    if drop_text:
+        for prop in ['text', 'textposition', 'textfont']:
+            reduced.pop(prop, None)
+        if 'mode' in reduced:
+            reduced['mode'] = '+'.join([m for m in reduced['mode'].split('+') if m != 'text']) or 'lines'
+    if webgl:
+        reduced['type'] = 'scattergl'
+    return reduced
+
+
+def reduce_figure(figure, max_points: int, webgl: bool = True, drop_text: bool = True):
+    """
+    Level-of-detail stage for graph windows. Every scatter trace having more points than max_points is downsampled
+    with LTTB and optionally switched to WebGL rendering and stripped of per-point text labels
+    """
+    if isinstance(figure, BaseFigure):
+        figure = figure.to_plotly_json()
+    if not isinstance(figure, dict) or not figure.get('data'):
+        return figure
+    return {
+        **figure,
+        'data': [reduce_trace(trace, max_points, webgl, drop_text) for trace in figure['data']]
+    }
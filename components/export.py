@@ -0,0 +1,157 @@
+"""
+Streaming export of the window data. The export link of a window holds the filter and parameter values of the window
+signed with the secret key of the app, so any worker serves the link until it expires. The query expressions are
+built on the server from the filters of the dashboard and the parameter values are checked against their options, like
+the window callbacks get them. The rows passing the filters are read from the datasource by chunks and every chunk is
+sent as soon as it's written (CSV lines or a Parquet row group), so the export is never built whole in memory
+"""
+from importlib.util import find_spec
+from io import BytesIO
+from os import environ
+from secrets import token_hex
+import flask
+from itsdangerous import BadSignature, SignatureExpired
+from .families import dashboards, export_serializer
+from .admission import admit_export
+from .constants import EXPORT_ROUTE, EXPORT_FORMATS, EXPORT_CHUNK_ROWS, EXPORT_LINK_MAX_AGE, SECRET_KEY_ENV
+
+
+def export_chunks(dashboard_obj, window_id: int, filterpanel_values: dict, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """
+    Rows of the exported datasource passing the filters of the window, the expressions of the parameters of the export
+    spec and the filters of the related datasources by chunks
+    """
+    spec = dashboard_obj.window_objs[window_id].export
+    datasource_obj = dashboard_obj.datasource_objs[spec['datasource']]
+    query_expressions = filterpanel_values['query_expressions']
+    parameters = filterpanel_values.get('parameters', {})
+    query = ' & '.join(
+        f'({part})' for part in [query_expressions.get(spec['datasource'])]
+        + [parameters.get(parameter) for parameter in spec['parameters']] if part
+    )
+    related = {
+        dimension_id: query_expressions.get(dimension_id)
+        for dimension_id in datasource_obj.relationships.keys() if query_expressions.get(dimension_id)
+    }
+    return datasource_obj.chunks(query, related, spec['join'], chunk_rows)
+
+
+def csv_stream(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode()
+        header = False
+
+
+class _Drain:
+    """ Write-only file the Parquet writer writes to, the written bytes are taken out after every row group """
+
+    def __init__(self):
+        self.buffer = BytesIO()
+        self.closed = False
+
+    def write(self, data) -> int:
+        return self.buffer.write(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+def parquet_stream(chunks):
+    """ Every chunk is a row group, the schema is the one of the first chunk """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink, writer = _Drain(), None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(sink, table.schema)
+            else:
+                table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+            yield sink.take()
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.take()
+
+
+def window_state(dashboard_obj, window_id: int, filters: dict, parameters: dict) -> dict or None:
+    """
+    Filter panel state of the window built from the filter values by datasource and column and the parameter values,
+    None if a parameter value isn't one of its options
+    """
+    states = {}
+    for filter_obj in dashboard_obj.filter_objs.values():
+        filter_type, value = filters.get(filter_obj.datasource_id, {}).get(filter_obj.source_column, [None, None])
+        if filter_type != filter_obj.filter_type:
+            continue
+        if filter_type == 'daterange':
+            states[f'{filter_obj.component_id}.start_date'], states[f'{filter_obj.component_id}.end_date'] = value
+        else:
+            states[f'{filter_obj.component_id}.value'] = value
+    for param_obj in dashboard_obj.parameter_objs.values():
+        value = parameters.get(param_obj.parameter_type, param_obj.default_value)
+        if value not in [option['value'] for option in param_obj.options]:
+            return None
+        states[f'{param_obj.component_id}.value'] = value
+    return dashboard_obj.filterpanel_state(states, window_id)
+
+
+def init_export(server, structure_obj=None, scheduler=None) -> None:
+    """
+    Adds the export route, with the admission scheduler the exports wait for a slot of the lowest priority. The links
+    are signed with the secret key of the server, taken from the environment variable unless it's set. Without it
+    every process gets its own key, so the workers of the app should share the environment variable or be forked after
+    the app is created (--preload). The dashboards the other workers have unloaded are loaded again through the
+    structure
+    """
+    if not server.secret_key:
+        server.secret_key = environ.get(SECRET_KEY_ENV) or token_hex(32)
+
+    def view(token: str, export_format: str):
+        if export_format not in EXPORT_FORMATS:
+            flask.abort(404)
+        try:
+            entry = export_serializer().loads(token, max_age=EXPORT_LINK_MAX_AGE)
+        except SignatureExpired:
+            return flask.Response('The export link has expired. Apply filters to get a new one', status=410,
+                                  mimetype='text/plain')
+        except BadSignature:
+            return flask.Response('The export link is invalid. Apply filters to get a new one', status=404,
+                                  mimetype='text/plain')
+        dashboard_obj = dashboards.get(entry['dashboard'])
+        if dashboard_obj is None and structure_obj is not None:
+            dashboard_obj = structure_obj.get_dashboard(entry['url'])
+        if dashboard_obj is None or entry['window'] not in dashboard_obj.window_objs:
+            return flask.Response('The dashboard of the export is gone', status=410, mimetype='text/plain')
+        state = window_state(dashboard_obj, entry['window'], entry['filters'], entry['parameters'])
+        if state is None:
+            return flask.Response('The export link is invalid. Apply filters to get a new one', status=404,
+                                  mimetype='text/plain')
+        if export_format == 'parquet' and find_spec('pyarrow') is None:
+            return flask.Response('Parquet export needs pyarrow', status=501, mimetype='text/plain')
+
+        def response():
+            chunks = export_chunks(dashboard_obj, entry['window'], state)
+            stream = csv_stream(chunks) if export_format == 'csv' else parquet_stream(chunks)
+            filename = f"{dashboard_obj.id_prefix}-{entry['window']}.{export_format}"
+            return flask.Response(stream, mimetype=EXPORT_FORMATS[export_format],
+                                  headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+        if scheduler is not None:
+            return admit_export(scheduler, response, (dashboard_obj.id_prefix, str(entry['window']), 'export'))
+        return response()
+
+    server.add_url_rule(f'{EXPORT_ROUTE}/<token>.<export_format>', 'export', view)
@@ -0,0 +1,221 @@
+"""
+Pattern-matching callback families. Framework components of every dashboard have dict ids built with family_id,
+so a single callback serves all components of a type instead of a concrete callback per filter, window or dashboard,
+and the callback graph doesn't grow with the content
+"""
+from math import ceil
+import flask
+from itsdangerous import URLSafeTimedSerializer
+from weakref import WeakValueDictionary
+from dash import html, dash_table, callback_context as ctx, no_update, ClientsideFunction, MATCH, ALL
+from dash.exceptions import PreventUpdate
+from .store import server_store
+from .funcs import content_hash
+from .constants import TABLE_STYLE_CELL, TABLE_STYLE_HEADER, TABLE_PAGE_SIZE, EXPORT_ROUTE
+
+# Dashboards by id prefix, the store propagation callback builds the filter panel state through them
+dashboards = WeakValueDictionary()
+
+
+def _pattern(component_type: str, **keys) -> dict:
+    return {'type': component_type, 'dashboard': MATCH, **keys}
+
+
+def _checkbox_sync() -> dict:
+    def checkbox_sync(listed_value, all_value, options):
+        listed_options = [option['value'] for option in options]
+        if ctx.triggered_id['type'] == 'filter_all_value':
+            return listed_options if all_value else [], all_value
+        return listed_value, ['All'] if set(listed_value) == set(listed_options) else []
+
+    return {
+        'outputs': [(_pattern('filter', filter=MATCH), 'value'), (_pattern('filter_all_value', filter=MATCH), 'value')],
+        'inputs': [(_pattern('filter', filter=MATCH), 'value'), (_pattern('filter_all_value', filter=MATCH), 'value')],
+        'states': [(_pattern('filter', filter=MATCH), 'options')],
+        'func': checkbox_sync
+    }
+
+
+def _interval_sync() -> dict:
+    def interval_sync(range_value, min_value, max_value, min_state, max_state):
+        trigger_type = ctx.triggered_id['type']
+        if trigger_type == 'filter_min_input':
+            range_value = [min_value, max_state]
+        elif trigger_type == 'filter_max_input':
+            range_value = [min_state, max_value]
+        return range_value, range_value[0], range_value[1]
+
+    components = [_pattern(t, filter=MATCH) for t in ['filter', 'filter_min_input', 'filter_max_input']]
+    return {
+        'outputs': [(component, 'value') for component in components],
+        'inputs': [(component, 'value') for component in components],
+        'states': [(components[1], 'value'), (components[2], 'value')],
+        'func': interval_sync
+    }
+
+
+def _filterpanel_values() -> dict:
+    """
+    Propagates the filter panel state into the stores of the windows of the dashboard when filters are applied.
+    Every window gets the state of the filters targeting it, a store whose state didn't change isn't updated, so
+    only the windows affected by the change recompute
+    """
+
+    def filterpanel_values(n_clicks, *args):
+        dashboard_obj = dashboards.get(ctx.inputs_list[0]['id']['dashboard'])
+        if dashboard_obj is None:
+            raise PreventUpdate
+        values = {
+            (state['id'].get('filter', state['id'].get('parameter')), state['property']): state.get('value')
+            for states in ctx.states_list[:-1] for state in states
+        }
+        states = {}
+        for filter_obj in dashboard_obj.filter_objs.values():
+            props = ['start_date', 'end_date'] if filter_obj.filter_type == 'daterange' else ['value']
+            for prop in props:
+                states[f'{filter_obj.component_id}.{prop}'] = values.get((filter_obj.component_id, prop))
+        for param_obj in dashboard_obj.parameter_objs.values():
+            states[f'{param_obj.component_id}.value'] = values.get((param_obj.component_id, 'value'))
+        current = {state['id']['window']: state.get('value') for state in ctx.states_list[-1]}
+        outputs = []
+        for output in ctx.outputs_list:
+            window_id = output['id']['window']
+            state = dashboard_obj.filterpanel_state(states, window_id)
+            outputs.append(no_update if content_hash(state) == content_hash(current.get(window_id)) else state)
+        if all(output is no_update for output in outputs):
+            raise PreventUpdate
+        return outputs
+
+    return {
+        'outputs': [(_pattern('filterpanel_values_store', window=ALL), 'data')],
+        'inputs': [(_pattern('apply_filters_button'), 'n_clicks')],
+        'states': [
+            (_pattern('filter', filter=ALL), 'value'),
+            (_pattern('filter', filter=ALL), 'start_date'),
+            (_pattern('filter', filter=ALL), 'end_date'),
+            (_pattern('parameter', parameter=ALL), 'value'),
+            (_pattern('filterpanel_values_store', window=ALL), 'data'),
+        ],
+        'func': filterpanel_values,
+        'initial_call': True,
+    }
+
+
+def _table_show() -> dict:
+    """
+    Opens the data table modal of a window. A string in the store is a key of the server store (table_store='server'),
+    such table is resolved from there and paged by the table page callback
+    """
+
+    def table_show(n_clicks, data):
+        if isinstance(data, str):
+            data = server_store.get(data)
+            if not data:
+                return True, html.P("Data has expired. Apply filters to load it again")
+            records = data['table']
+            window = ctx.triggered_id
+            table = dash_table.DataTable(
+                id={**window, 'type': 'table_modal_table'},
+                columns=[{'name': column, 'id': column} for column in (records[0] if records else [])],
+                data=records[:TABLE_PAGE_SIZE],
+                page_action='custom',
+                page_current=0,
+                page_size=TABLE_PAGE_SIZE,
+                page_count=max(ceil(len(records) / TABLE_PAGE_SIZE), 1),
+                style_cell=TABLE_STYLE_CELL,
+                style_header=TABLE_STYLE_HEADER
+            )
+            return True, table
+        elif data:
+            table = dash_table.DataTable(data['table'], style_cell=TABLE_STYLE_CELL, style_header=TABLE_STYLE_HEADER)
+            return True, table
+        else:
+            return True, html.P("No data yet")
+
+    modal = _pattern('table_modal', window=MATCH)
+    return {
+        'outputs': [(modal, 'is_open'), (modal, 'children')],
+        'inputs': [(_pattern('table_button', window=MATCH), 'n_clicks')],
+        'states': [(_pattern('table_store', window=MATCH), 'data')],
+        'func': table_show
+    }
+
+
+def _table_page() -> dict:
+    def table_page(page_current, page_size, key):
+        data = server_store.get(key) if isinstance(key, str) else None
+        if not data:
+            raise PreventUpdate
+        start = page_current * page_size
+        return data['table'][start:start + page_size]
+
+    table = _pattern('table_modal_table', window=MATCH)
+    return {
+        'outputs': [(table, 'data')],
+        'inputs': [(table, 'page_current'), (table, 'page_size')],
+        'states': [(_pattern('table_store', window=MATCH), 'data')],
+        'func': table_page
+    }
+
+
+def export_serializer() -> URLSafeTimedSerializer:
+    """ Signs the export links with the secret key of the app and the time they were made """
+    return URLSafeTimedSerializer(flask.current_app.secret_key, salt='export')
+
+
+def _export_link() -> dict:
+    """ Points the export link of a window to its signed filter and parameter values (see export.py) """
+
+    def export_link(filterpanel_values):
+        window = ctx.triggered_id
+        dashboard_obj = dashboards.get(window['dashboard'])
+        if dashboard_obj is None or not filterpanel_values:
+            raise PreventUpdate
+        token = export_serializer().dumps({
+            'dashboard': window['dashboard'], 'url': dashboard_obj.url, 'window': window['window'],
+            'filters': filterpanel_values.get('filters', {}), 'parameters': filterpanel_values.get('parameters', {})
+        })
+        export_format = dashboard_obj.window_objs[window['window']].export['format']
+        return f"{flask.request.script_root}{EXPORT_ROUTE}/{token}.{export_format}"
+
+    return {
+        'outputs': [(_pattern('export_link', window=MATCH), 'href')],
+        'inputs': [(_pattern('filterpanel_values_store', window=MATCH), 'data')],
+        'func': export_link
+    }
+
+
+def _datasource_request() -> dict:
+    """ The browser requests the copy of a clientside datasource when the stored one isn't of the current version """
+    store = _pattern('datasource_store', datasource=MATCH)
+    return {
+        'outputs': [(_pattern('datasource_request', datasource=MATCH), 'data')],
+        'inputs': [(store, 'modified_timestamp')],
+        'states': [(_pattern('datasource_version', datasource=MATCH), 'data'), (store, 'data')],
+        'func': ClientsideFunction('datasources', 'stale'),
+        'initial_call': True,
+    }
+
+
+def _datasource_payload() -> dict:
+    """ Sends the columnar copy of a clientside datasource into the store of the browser """
+
+    def datasource_payload(version):
+        request = ctx.triggered_id
+        dashboard_obj = dashboards.get(request['dashboard'])
+        if dashboard_obj is None or not version:
+            raise PreventUpdate
+        return dashboard_obj.datasource_objs[request['datasource']].payload()
+
+    return {
+        'outputs': [(_pattern('datasource_store', datasource=MATCH), 'data')],
+        'inputs': [(_pattern('datasource_request', datasource=MATCH), 'data')],
+        'func': datasource_payload
+    }
+
+
+def family_callbacks() -> list:
+    return [
+        _checkbox_sync(), _interval_sync(), _filterpanel_values(), _table_show(), _table_page(), _export_link(),
+        _datasource_request(), _datasource_payload()
+    ]
@@ -2,8 +2,9 @@ try:
     from typing import Literal
 except ImportError:
     from typing_extensions import Literal
-from dash import dcc, html, callback_context
+from dash import dcc, html
 import dash_bootstrap_components as dbc
+from .funcs import family_id
 
 
 class Filter:
@@ -29,17 +30,19 @@ class Filter:
         self.target_windows = target_windows if target_windows else []
         self._set_default_value(default_value)
         self.callbacks = []
-        self._create_item()
-        self._filter_sync()
         self._query_expression()
 
     def _set_id_prefix(self, project_id: str = None):
         dash_filter = f"{self.dashboard_id}-{self.id}"
         self.id_prefix = dash_filter if not project_id else f"{project_id}-{dash_filter}"
+        self.dashboard_prefix = self.dashboard_id if not project_id else f"{project_id}-{self.dashboard_id}"
 
     def _set_component_id(self):
         self.component_id = f"{self.id_prefix}-filter"
 
+    def _dict_id(self, component_type: str = 'filter') -> dict:
+        return family_id(component_type, self.dashboard_prefix, filter=self.component_id)
+
     def _validate_value_type(self, target_value: str) -> bool:
         if self.filter_type == 'radio':
             if not isinstance(target_value, (int, str)):
@@ -80,7 +83,7 @@ class Filter:
 
     def _checkbox(self) -> list:
         all_value_item = dbc.Checklist(
-            id=self.component_id + "-all-value",
+            id=self._dict_id('filter_all_value'),
             options=[{"label": "All", "value": "All"}],
             value=['All'],
             persistence=True,
@@ -88,7 +91,7 @@ class Filter:
             class_name='all-value-option filter'
         )
         listed_values_item = dbc.Checklist(
-            id=self.component_id,
+            id=self._dict_id(),
             options=self._set_options(),
             value=self.default_value,
             persistence=True,
@@ -99,7 +102,7 @@ class Filter:
 
     def _radio(self) -> dcc.RadioItems:
         return dcc.RadioItems(
-            id=self.component_id,
+            id=self._dict_id(),
             options=self._set_options(),
             value=self.default_value,
             className='filter'
@@ -110,13 +113,13 @@ class Filter:
         return html.Div(
             [
                 dcc.Input(
-                    id=self.component_id + f'-min-input',
+                    id=self._dict_id('filter_min_input'),
                     type='number',
                     value=minv,
                     className='interval-input'
                 ),
                 dcc.RangeSlider(
-                    id=self.component_id,
+                    id=self._dict_id(),
                     marks=None,
                     min=minv,
                     max=maxv,
@@ -126,7 +129,7 @@ class Filter:
                     className='interval-slider'
                 ),
                 dcc.Input(
-                    id=self.component_id + f'-max-input',
+                    id=self._dict_id('filter_max_input'),
                     type='number',
                     value=maxv,
                     className='interval-input'
@@ -138,7 +141,7 @@ class Filter:
     def _date_range_picker(self):
         minv, maxv = self.default_value
         return dcc.DatePickerRange(
-            id=self.component_id,
+            id=self._dict_id(),
             calendar_orientation='vertical',
             first_day_of_week=1,
             display_format='DD.MM.YYYY',
@@ -172,68 +175,8 @@ class Filter:
         }
         self.query_expression = queries[self.filter_type]
 
-    def _filter_sync(self) -> None:
-        if self.filter_type == 'interval':
-            def interval_sync_callback(*args):
-                ctx = callback_context
-                trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
-                if trigger_id.endswith("input"):
-                    if 'min' in trigger_id:
-                        min_value = ctx.triggered[0]['value']
-                        max_value = ctx.states[self.component_id + '-max-input.value']
-                    else:
-                        max_value = ctx.triggered[0]['value']
-                        min_value = ctx.states[self.component_id + '-min-input.value']
-                    range_values = [min_value, max_value]
-                else:
-                    range_values = ctx.triggered[0]['value']
-                    min_value = range_values[0]
-                    max_value = range_values[1]
-                return range_values, min_value, max_value
-            self.filter_sync = {
-                'outputs': [
-                    (self.component_id, 'value'),
-                    (self.component_id + '-min-input', 'value'),
-                    (self.component_id + '-max-input', 'value')
-                ],
-                'inputs': [
-                    (self.component_id, 'value'),
-                    (self.component_id + '-min-input', 'value'),
-                    (self.component_id + '-max-input', 'value')
-                ],
-                'states': [
-                    (self.component_id + '-min-input', 'value'),
-                    (self.component_id + '-max-input', 'value')
-                ],
-                'func': interval_sync_callback
-            }
-            self.callbacks.append(self.filter_sync)
-
-        if self.filter_type == 'checkbox':
-            def checkbox_sync_callback(listed_val, all_val, state_val, options):
-                ctx = callback_context
-                trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
-                trigger_options = [d['value'] for d in ctx.states[f'{self.component_id}.options']]
-                if trigger_id.endswith("all-value"):
-                    all_value = ctx.triggered[0]['value']
-                    checklist_vals = trigger_options if all_value else []
-                else:
-                    checklist_vals = ctx.triggered[0]['value']
-                    all_value = ['All'] if set(checklist_vals) == set(trigger_options) else []
-                return checklist_vals, all_value
-            self.filter_sync = {
-                'outputs': [(self.component_id, 'value'), (self.component_id + '-all-value', 'value'), ],
-                'inputs': [(self.component_id, 'value'), (self.component_id + '-all-value', 'value')],
-                'states': [(self.component_id, 'value'), (self.component_id, 'options')],
-                'initial_call': False,
-                'func': checkbox_sync_callback
-            }
-            self.callbacks.append(self.filter_sync)
-
-    def update_ids(self, project_id) -> None:
+    def build(self, project_id: str = None) -> None:
+        """ Builds the filter component with the final ids, the dashboard calls it once when it's finalized """
         self._set_id_prefix(project_id)
         self._set_component_id()
         self._create_item()
-
-        if self.filter_type in ['checkbox', 'interval']:
-            self._filter_sync()
@@ -1,6 +1,18 @@
 from typing import Any
+from functools import wraps
+from hashlib import sha1
+import json
 import os
-from .constants import IGNORED
+from dash._callback import NoUpdate
+from .constants import IGNORED, FAMILY_COMPONENTS
+
+
+def family_id(component_type: str, dashboard: str, **keys) -> dict:
+    """
+    Dict id of a framework component. Components of the same type share pattern-matching callbacks, which find the
+    dashboard (and the window or the filter) the component belongs to by the other keys of the id
+    """
+    return {'type': component_type, 'dashboard': dashboard, **keys}
 
 
 def to_dependencies(id_prefix: str, target: dict) -> list:
@@ -8,10 +20,18 @@ def to_dependencies(id_prefix: str, target: dict) -> list:
     for window_id, components in target.items():
         for component in components:
             component_type, attr = component.split('.')
-            output.append((f'{id_prefix}-{window_id}-{component_type}', attr))
+            if component_type in FAMILY_COMPONENTS:
+                output.append((family_id(component_type, id_prefix, window=window_id), attr))
+            else:
+                output.append((f'{id_prefix}-{window_id}-{component_type}', attr))
     return output
 
 
+def content_hash(value) -> str:
+    """ Hash of a JSON-like value, equal for the values equal after the JSON round trip """
+    return sha1(json.dumps(value, sort_keys=True, separators=(',', ':'), default=str).encode()).hexdigest()
+
+
 def merge_children(items: list) -> list:
     result = []
     for i in items:
@@ -30,3 +50,32 @@ def get_clear_args(args):
 def get_names(path):
     return [item.replace('.py', '') for item in os.listdir(path) if item not in IGNORED]
 
+
+def apply_output_hooks(func, hooks: list):
+    """
+    Wraps callback function so that every returned value is passed through the hook defined for its output.
+    Hooks are aligned with callback outputs, None means the value is returned as is
+    """
+    if not any(hooks):
+        return func
+
+    def process(hook, value):
+        return value if hook is None or isinstance(value, NoUpdate) else hook(value)
+
+    @wraps(func)
+    def wrapper(*args):
+        result = func(*args)
+        if len(hooks) == 1:
+            return process(hooks[0], result)
+        return [process(hook, value) for hook, value in zip(hooks, result)]
+
+    return wrapper
+
+
+def chain(*funcs):
+    """ Composes single-argument functions applying them from left to right """
+    def chained(value):
+        for func in funcs:
+            value = func(value)
+        return value
+    return chained
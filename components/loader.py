@@ -0,0 +1,139 @@
+import pickle
+from threading import RLock
+from urllib.parse import urlsplit
+import flask
+from .structure import Structure
+from .callback import Callback, register_callbacks
+from .store import LRUCache
+from .constants import LAZY_MAX_DASHBOARDS
+
+
+def flatten(dependencies) -> list:
+    """ Flat list of the dependencies of a callback request, pattern-matching ones come as nested lists """
+    if not isinstance(dependencies, list):
+        return [dependencies] if dependencies else []
+    return [item for dependency in dependencies for item in flatten(dependency)]
+
+
+class DashboardLoader:
+    """
+    Route table of the lazy mode. The routes come from the projects directory listing, a dashboard module is imported
+    and its callbacks are registered on the first request to the dashboard. Only max_loaded dashboards are kept,
+    the least recently used one is unloaded together with its callback functions once the requests to it in flight
+    are done. Callback specs stay in the app dependencies, so a page still open in the browser loads the dashboard
+    back with its next callback request.
+    With a snapshot the pages are rendered from the snapshot layouts and the callback specs of all dashboards are
+    registered upfront, so a dashboard is imported only when the first of its callbacks is called
+    """
+
+    def __init__(self, project_objs: dict, max_loaded: int = LAZY_MAX_DASHBOARDS, snapshot: dict = None,
+                 middlewares: list = None):
+        self.project_objs = project_objs
+        self.middlewares = middlewares if middlewares else []
+        self.pages = snapshot['pages'] if snapshot else {}
+        self.callback_specs = snapshot['callbacks'] if snapshot else []
+        self.preregistered = snapshot is not None
+        self.routes = {
+            url: (project_obj, url.rsplit('/', 1)[1])
+            for project_obj in project_objs.values() for url in project_obj.navigation.keys()
+        }
+        self.id_prefixes = {
+            f'{project_obj.id}-{dashboard_name}': url for url, (project_obj, dashboard_name) in self.routes.items()
+        }
+        self.loaded = LRUCache(max_loaded, on_evict=self._unload)
+        self.app = None
+        self._callback_ids = {}
+        self._in_flight = {}
+        self._deferred = set()
+        self._lock = RLock()
+
+    def bind(self, app) -> None:
+        self.app = app
+        app._callback_list.extend(self.callback_specs)
+        app.server.before_request(self._load_requested)
+        app.server.teardown_request(self._finish_requested)
+
+    def get(self, url: str):
+        """ Returns the dashboard object of the url importing it if needed """
+        dashboard_obj = self.loaded.get(url)
+        if dashboard_obj is None and url in self.routes:
+            with self._lock:
+                dashboard_obj = self.loaded.get(url)
+                if dashboard_obj is None:
+                    dashboard_obj = self._load(url)
+        return dashboard_obj
+
+    def page(self, url: str) -> list or None:
+        """ Overview modal, dashboard div and filter panel of the url """
+        if url in self.pages:
+            return pickle.loads(self.pages[url])
+        dashboard_obj = self.get(url)
+        if dashboard_obj is None:
+            return None
+        return [dashboard_obj.overview_modal, dashboard_obj.dashboard_div, dashboard_obj.filterpanel_comp]
+
+    def _load(self, url: str):
+        project_obj, dashboard_name = self.routes[url]
+        self._deferred.discard(url)
+        dashboard_obj = project_obj.load_dashboard(dashboard_name)
+        project_obj.navigation[url] = dashboard_obj.name
+        for cb in Structure.dashboard_callbacks(dashboard_obj):
+            Callback(**cb, middlewares=self.middlewares)
+        self._callback_ids[url] = register_callbacks(self.app)
+        self.loaded.set(url, dashboard_obj)
+        return dashboard_obj
+
+    def _unload(self, url: str, dashboard_obj) -> None:
+        """ Unloads the dashboard, or marks it to be unloaded by the last request to it in flight """
+        with self._lock:
+            if self._in_flight.get(url):
+                self._deferred.add(url)
+                return
+        project_obj, dashboard_name = self.routes[url]
+        for callback_id in self._callback_ids.pop(url, []):
+            self.app.callback_map.pop(callback_id, None)
+        project_obj.unload_dashboard(dashboard_name)
+
+    def _requested_url(self) -> str or None:
+        """
+        Finds out which dashboard the request belongs to: by the path for the page itself, by the id prefix of the
+        outputs, the dashboard key of the dict ids or the url input for callback requests and by the referrer for
+        the other Dash requests
+        """
+        request = flask.request
+        if request.path == '/_dash-update-component':
+            body = request.get_json(silent=True) or {}
+            output = body.get('output', '').lstrip('.')
+            for id_prefix, url in self.id_prefixes.items():
+                if output.startswith(f'{id_prefix}-'):
+                    return url
+            for dependency in flatten(body.get('outputs')) + flatten(body.get('inputs')):
+                component_id = dependency.get('id')
+                if isinstance(component_id, dict) and component_id.get('dashboard') in self.id_prefixes:
+                    return self.id_prefixes[component_id['dashboard']]
+                if component_id == 'url' and dependency.get('property') == 'pathname':
+                    return dependency.get('value')
+        if request.path.startswith('/_dash-'):
+            return urlsplit(request.referrer).path if request.referrer else None
+        return request.script_root + request.path
+
+    def _load_requested(self) -> None:
+        url = self._requested_url()
+        if url in self.routes:
+            with self._lock:
+                self._in_flight[url] = self._in_flight.get(url, 0) + 1
+            flask.g.loader_url = url
+            self.get(url)
+
+    def _finish_requested(self, exception=None) -> None:
+        url = flask.g.pop('loader_url', None)
+        if url is None:
+            return
+        with self._lock:
+            self._in_flight[url] -= 1
+            if self._in_flight[url]:
+                return
+            del self._in_flight[url]
+            if url in self._deferred:
+                self._deferred.discard(url)
+                self._unload(url, None)
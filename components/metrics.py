@@ -0,0 +1,141 @@
+from bisect import bisect_left
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+import flask
+from dash.exceptions import PreventUpdate
+from .constants import LATENCY_BUCKETS, SIZE_BUCKETS, METRICS_ROUTE
+
+LABEL_NAMES = ('dashboard', 'window', 'output')
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    def __init__(self, buckets: list):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Per-process registry of callback metrics. Every gunicorn worker keeps its own numbers, so each worker should be
+    scraped separately (or labeled by the scraper) to get the full picture
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.help = {}
+
+    def _register(self, name: str, kind: str, help_text: str) -> None:
+        self.help.setdefault(name, (kind, help_text))
+
+    def observe(self, name: str, labels: tuple, value: float, buckets: list, help_text: str = '') -> None:
+        with self._lock:
+            self._register(name, 'histogram', help_text)
+            series = self.histograms.setdefault(name, {})
+            if labels not in series:
+                series[labels] = Histogram(buckets)
+            series[labels].observe(value)
+
+    def inc(self, name: str, labels: tuple, value: float = 1, help_text: str = '') -> None:
+        with self._lock:
+            self._register(name, 'counter', help_text)
+            series = self.counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def add(self, name: str, labels: tuple, value: float, help_text: str = '') -> None:
+        with self._lock:
+            self._register(name, 'gauge', help_text)
+            series = self.gauges.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    @staticmethod
+    def _labels(labels: tuple, extra: str = '') -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(LABEL_NAMES, labels)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}'
+
+    def render(self) -> str:
+        """ Renders all metrics in Prometheus text exposition format """
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in sorted(self.help.items()):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                if kind == 'histogram':
+                    for labels, histogram in self.histograms[name].items():
+                        cumulative = 0
+                        for bound, count in zip(histogram.buckets + [float('inf')], histogram.counts):
+                            cumulative += count
+                            le = 'le="+Inf"' if bound == float('inf') else f'le="{bound}"'
+                            lines.append(f'{name}_bucket{self._labels(labels, le)} {cumulative}')
+                        lines.append(f'{name}_sum{self._labels(labels)} {histogram.sum}')
+                        lines.append(f'{name}_count{self._labels(labels)} {histogram.count}')
+                else:
+                    series = self.counters[name] if kind == 'counter' else self.gauges[name]
+                    for labels, value in series.items():
+                        lines.append(f'{name}{self._labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+def instrument(func, callback_obj):
+    """ Callback middleware recording latency, errors and concurrency labeled by dashboard, window and output """
+    labels = tuple(callback_obj.labels[name] for name in LABEL_NAMES)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if flask.has_request_context():
+            flask.g.callback_labels = labels
+            if flask.request.content_length is not None:
+                metrics.observe('dash_callback_request_bytes', labels, flask.request.content_length, SIZE_BUCKETS,
+                                'Size of callback request bodies')
+        metrics.add('dash_callback_in_flight', labels, 1, 'Callbacks being executed right now')
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            metrics.inc('dash_callback_prevented_total', labels, help_text='Callbacks that prevented the update')
+            raise
+        except Exception:
+            metrics.inc('dash_callback_errors_total', labels, help_text='Callbacks that raised an exception')
+            raise
+        finally:
+            metrics.observe('dash_callback_latency_seconds', labels, perf_counter() - start, LATENCY_BUCKETS,
+                            'Callback function execution time')
+            metrics.add('dash_callback_in_flight', labels, -1, 'Callbacks being executed right now')
+
+    return wrapper
+
+
+def init_metrics(server) -> None:
+    """ Adds the metrics route and the response size hook to the flask server """
+
+    @server.after_request
+    def record_response_size(response):
+        labels = flask.g.get('callback_labels')
+        if labels is not None and not response.is_streamed:
+            metrics.observe('dash_callback_response_bytes', labels, response.calculate_content_length() or 0,
+                            SIZE_BUCKETS, 'Size of callback response bodies')
+        return response
+
+    def metrics_view():
+        return flask.Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    server.add_url_rule(METRICS_ROUTE, 'metrics', metrics_view)
@@ -4,8 +4,9 @@ from dash_iconify import DashIconify
 
 
 class NavBar:
-    def __init__(self, mode, navigation: dict = None):
+    def __init__(self, mode, navigation: dict = None, external_links: bool = False):
         self.navigation = navigation
+        self.external_links = external_links
         self.nav_menu_items_container = dbc.Nav(horizontal='start', id='menu-items-container')
         self.nav_menu_div = html.Div(self.nav_menu_items_container, id='dashboards-menu', className='dropdown-menu')
         self.nav_menu_button = html.Button(id='pages_list-btn')
@@ -134,7 +135,8 @@ class NavBar:
                         dbc.NavLink(
                             name,
                             href=url,
-                            class_name='link'
+                            class_name='link',
+                            external_link=self.external_links
                         )
                     )
                     for url, name in dashboard_links.items()
@@ -0,0 +1,64 @@
+import flask
+from dash import Output
+from dash._utils import create_callback_id
+from .store import LRUCache
+from .constants import PAGE_CACHE_SIZE
+
+
+def page_fingerprint(dashboard_obj) -> str:
+    """ Changes when the dashboard module is loaded again or the options of its datasources change """
+    parts = [f'{dashboard_obj.module_mtime:.0f}']
+    parts.extend(
+        f'{ds_id}:{ds.version}:{ds.options_version}' for ds_id, ds in dashboard_obj.datasource_objs.items()
+    )
+    return '|'.join(parts)
+
+
+class PageCache:
+    """
+    Keeps the serialized response of the page rendering callback for every url. The response is built by Dash once,
+    the next requests of the url are answered with the cached bytes before Dash dispatches them
+    """
+
+    def __init__(self, structure_obj, max_items: int = PAGE_CACHE_SIZE):
+        self.structure_obj = structure_obj
+        self.output_id = create_callback_id([Output(o, p) for o, p in structure_obj.render_page_outputs])
+        self.entries = LRUCache(max_items)
+
+    def _fingerprint(self, url: str) -> str or None:
+        if url == self.structure_obj.home_obj.url:
+            return 'home'
+        dashboard_obj = self.structure_obj.get_dashboard(url)
+        return page_fingerprint(dashboard_obj) if dashboard_obj is not None else None
+
+    def serve_cached(self):
+        request = flask.request
+        if request.path != '/_dash-update-component':
+            return None
+        body = request.get_json(silent=True) or {}
+        if body.get('output') != self.output_id:
+            return None
+        url = next((i.get('value') for i in body.get('inputs', []) if i.get('id') == 'url'), None)
+        fingerprint = self._fingerprint(url)
+        if fingerprint is None:
+            return None
+
+        entry = self.entries.get(url)
+        if entry is None or entry[0] != fingerprint:
+            flask.g.page_cache = (url, fingerprint)
+            return None
+        return flask.Response(entry[1], mimetype='application/json')
+
+    def store(self, response):
+        page = flask.g.get('page_cache')
+        if page is not None and response.status_code == 200 and not response.is_streamed:
+            url, fingerprint = page
+            self.entries.set(url, (fingerprint, response.get_data()))
+        return response
+
+
+def init_page_cache(server, structure_obj) -> PageCache:
+    page_cache = PageCache(structure_obj)
+    server.before_request(page_cache.serve_cached)
+    server.after_request(page_cache.store)
+    return page_cache
@@ -5,6 +5,7 @@ except ImportError:
 from dash import dcc
 from dash.html import Param
 import dash_bootstrap_components as dbc
+from .funcs import family_id
 
 
 class Parameter:
@@ -18,15 +19,15 @@ class Parameter:
         self.component_id = f"{self.dashboard_id}-{self.id}-parameter-{self.parameter_type}"
         self.options = [{"label": label, "value": value} for label, value in options.items()]
         self.default_value = default_value
-        self._create_item()
 
     def _set_id_prefix(self, project_id: str = None):
         dash_param = f"{self.dashboard_id}-{self.id}"
         self.id_prefix = dash_param if not project_id else f"{project_id}-{dash_param}"
+        self.dashboard_prefix = self.dashboard_id if not project_id else f"{project_id}-{self.dashboard_id}"
 
     def _radio(self) -> dcc.RadioItems:
         return dcc.RadioItems(
-            id=self.component_id,
+            id=family_id('parameter', self.dashboard_prefix, parameter=self.component_id),
             options=self.options,
             value=self.default_value,
             className='filter'
@@ -42,7 +43,8 @@ class Parameter:
             class_name=self.parameter_type
         )
 
-    def update_ids(self, project_id) -> None:
+    def build(self, project_id: str = None) -> None:
+        """ Builds the parameter component with the final ids, the dashboard calls it once when it's finalized """
         self._set_id_prefix(project_id)
         self.component_id = f"{self.id_prefix}-parameter-{self.parameter_type}"
         self._create_item()
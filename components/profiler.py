@@ -0,0 +1,203 @@
+"""
+On-demand profiling of the callbacks. The armed targets and the collected profiles live in the process, so under
+a server with several workers the arm request, the profiled invocations and the download have to reach the same
+worker. The responses of the profiler routes carry the pid of the worker in the X-Profiler-Pid header to check it,
+or the profiler can be used with a single worker
+"""
+import cProfile
+import marshal
+import pstats
+import sys
+from collections import Counter
+from functools import wraps
+from hmac import compare_digest
+from os import environ, getpid
+from threading import Event, Lock, Thread, get_ident
+import flask
+from .constants import PROFILER_ROUTE, PROFILER_TOKEN_ENV, PROFILER_SAMPLE_INTERVAL
+
+PROFILE_FORMATS = {
+    'pstats': ('application/octet-stream', 'prof'),
+    'folded': ('text/plain', 'folded'),
+}
+
+
+class Sampler:
+    """
+    Samples the stack of one thread at a fixed interval and counts collapsed stacks. Frames above the root frame
+    (server and dash internals) are cut off
+    """
+
+    def __init__(self, thread_id: int, stacks: Counter, root_frame, interval: float = PROFILER_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.root_frame = root_frame
+        self.stacks = stacks
+        self.interval = interval
+        self._stop = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root_frame:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+
+
+class Profiler:
+    """
+    Profiles the next N invocations of a chosen callback. A callback is chosen by one of its output component ids
+    (as built by to_dependencies) or by its full output id. While nothing is armed the only overhead is a dict check
+    """
+
+    def __init__(self):
+        self.armed = {}
+        self.results = {}
+        self._lock = Lock()
+
+    def arm(self, target: str, invocations: int = 1, fmt: str = 'pstats') -> None:
+        if fmt not in PROFILE_FORMATS:
+            raise ValueError(f'Profile format should be one of {list(PROFILE_FORMATS.keys())}')
+        with self._lock:
+            self.armed[target] = {'remaining': invocations, 'format': fmt}
+            self.results[target] = {
+                'format': fmt, 'requested': invocations, 'done': 0, 'data': None, 'stacks': Counter()
+            }
+
+    def _claim(self, keys: set) -> str or None:
+        with self._lock:
+            for target in keys & self.armed.keys():
+                self.armed[target]['remaining'] -= 1
+                if self.armed[target]['remaining'] <= 0:
+                    del self.armed[target]
+                return target
+        return None
+
+    def _record(self, target: str, profile: cProfile.Profile = None, stacks: Counter = None) -> None:
+        with self._lock:
+            result = self.results[target]
+            if profile is not None:
+                stats = pstats.Stats(profile)
+                if result['data'] is None:
+                    result['data'] = stats
+                else:
+                    result['data'].add(stats)
+            if stacks is not None:
+                result['stacks'].update(stacks)
+            result['done'] += 1
+
+    def run(self, target: str, func, *args, **kwargs):
+        if self.results[target]['format'] == 'pstats':
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args, **kwargs)
+            finally:
+                self._record(target, profile=profile)
+        else:
+            stacks = Counter()
+            try:
+                with Sampler(get_ident(), stacks, sys._getframe()):
+                    return func(*args, **kwargs)
+            finally:
+                self._record(target, stacks=stacks)
+
+    def dump(self, target: str) -> bytes or None:
+        with self._lock:
+            result = self.results.get(target)
+            if not result or not result['done']:
+                return None
+            if result['format'] == 'pstats':
+                return marshal.dumps(result['data'].stats)
+            return '\n'.join(f'{stack} {count}' for stack, count in result['stacks'].items()).encode()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                target: {'format': result['format'], 'requested': result['requested'], 'done': result['done']}
+                for target, result in self.results.items()
+            }
+
+
+profiler = Profiler()
+
+
+def profile(func, callback_obj):
+    """ Callback middleware running the callback under the profiler when it is armed for one of its outputs """
+    keys = {
+        output.component_id if isinstance(output.component_id, str) else output.component_id.get('type')
+        for output in callback_obj.outputs
+    }
+    keys.add(callback_obj.output_id)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not profiler.armed:
+            return func(*args, **kwargs)
+        target = profiler._claim(keys)
+        if target is None:
+            return func(*args, **kwargs)
+        return profiler.run(target, func, *args, **kwargs)
+
+    return wrapper
+
+
+def profiler_token() -> str or None:
+    return environ.get(PROFILER_TOKEN_ENV)
+
+
+def init_profiler(server) -> None:
+    """
+    Adds the profiler routes to the flask server. Every request should carry the token from the environment variable
+    in the X-Profiler-Token header. POST arms the profiler, GET shows its state and GET on the target downloads
+    the collected profile. The state and the profiles are of the worker named by the X-Profiler-Pid header
+    """
+    token = profiler_token()
+
+    def with_pid(response):
+        response.headers['X-Profiler-Pid'] = str(getpid())
+        return response
+
+    def authorized() -> bool:
+        if not compare_digest(flask.request.headers.get('X-Profiler-Token', ''), token):
+            return False
+        flask.after_this_request(with_pid)
+        return True
+
+    def arm_view():
+        if not authorized():
+            flask.abort(403)
+        if flask.request.method == 'GET':
+            return flask.jsonify(profiler.status())
+        args = flask.request.get_json(silent=True) or flask.request.form
+        try:
+            profiler.arm(args['target'], int(args.get('invocations', 1)), args.get('format', 'pstats'))
+        except (KeyError, ValueError) as error:
+            return flask.jsonify({'error': str(error)}), 400
+        return flask.jsonify(profiler.status())
+
+    def download_view(target):
+        if not authorized():
+            flask.abort(403)
+        data = profiler.dump(target)
+        if data is None:
+            return flask.jsonify(profiler.status()), 404
+        mimetype, extension = PROFILE_FORMATS[profiler.results[target]['format']]
+        return flask.Response(
+            data, mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{target}.{extension}"'}
+        )
+
+    server.add_url_rule(PROFILER_ROUTE, 'profiler_arm', arm_view, methods=['GET', 'POST'])
+    server.add_url_rule(f'{PROFILER_ROUTE}/<path:target>', 'profiler_download', download_view)
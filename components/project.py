@@ -4,10 +4,15 @@ from os.path import join, basename, dirname, split
 from .constants import DASHBOARDS_DIR
 from .funcs import get_names
 from .callback import Callback
+from .families import family_callbacks
 from dash import Dash, html, dcc
 import dash_bootstrap_components as dbc
 from dash_iconify import DashIconify
 from inspect import stack
+from contextvars import ContextVar
+
+# Set while the App imports the project modules of the lazy mode, the projects built meanwhile don't import dashboards
+lazy_loading = ContextVar('lazy_loading', default=False)
 
 
 class Project:
@@ -20,27 +25,25 @@ class Project:
         self.dashboards_path = join(split(self.project_path)[0], DASHBOARDS_DIR)
         self.all_dashboards = get_names(self.dashboards_path)
         self.dashboards_to_get = dashboards_to_get if dashboards_to_get else self.all_dashboards
+        self.lazy = lazy_loading.get()
         self.dashboard_objs = self._get_dashboards()
+        self.navigation = self._get_navigation()
 
         self.app = None
         self.callbacks = []
         self.server = None
 
-    def _get_dashboards(self) -> list:
+    def _get_dashboards(self) -> dict:
+        """
+        Imports the dashboards of the project. In lazy mode only the validity check is carried out, the dashboards are
+        imported one by one with load_dashboard when they are requested
+        """
         if set(self.dashboards_to_get).issubset(set(self.all_dashboards)):
             dashboard_objs = {}
-            for dashboard_name in self.dashboards_to_get:
-                dashboard_path = join(self.dashboards_path, dashboard_name + '.py')
-                module_name = dashboard_path.split('.')[0]
-
-                spec = spec_from_file_location(module_name, dashboard_path)
-                module = module_from_spec(spec)
-                spec.loader.exec_module(module)
-                modules[module_name] = module
-
-                dashboard_obj = vars(module)['dashboard']
-                dashboard_obj.update_dashboard(self.id, self.url)
-                dashboard_objs[dashboard_obj.id] = dashboard_obj
+            if not self.lazy:
+                for dashboard_name in self.dashboards_to_get:
+                    dashboard_obj = self.load_dashboard(dashboard_name)
+                    dashboard_objs[dashboard_obj.id] = dashboard_obj
             return dashboard_objs
         else:
             raise ValueError(f'''
@@ -49,6 +52,34 @@ class Project:
                     You've specified {self.dashboards_to_get}
             ''')
 
+    def _module_name(self, dashboard_name: str) -> str:
+        return join(self.dashboards_path, dashboard_name)
+
+    def load_dashboard(self, dashboard_name: str):
+        dashboard_path = join(self.dashboards_path, dashboard_name + '.py')
+        module_name = self._module_name(dashboard_name)
+
+        spec = spec_from_file_location(module_name, dashboard_path)
+        module = module_from_spec(spec)
+        spec.loader.exec_module(module)
+        modules[module_name] = module
+
+        dashboard_obj = vars(module)['dashboard']
+        dashboard_obj.update_dashboard(self.id, self.url)
+        return dashboard_obj
+
+    def unload_dashboard(self, dashboard_name: str) -> None:
+        modules.pop(self._module_name(dashboard_name), None)
+
+    def _get_navigation(self) -> dict:
+        """ Dashboard urls and names. Without imported dashboards the names are derived from the file names """
+        if self.dashboard_objs:
+            return {dashboard_obj.url: dashboard_obj.name for dashboard_obj in self.dashboard_objs.values()}
+        return {
+            f'{self.url}/{dashboard_name}': dashboard_name.replace('_', ' ').title()
+            for dashboard_name in self.dashboards_to_get
+        }
+
     def init_app(self):
         self.app = Dash(
             __name__, suppress_callback_exceptions=True, external_stylesheets=[dbc.themes.SLATE],
@@ -122,16 +153,11 @@ class Project:
             )
         )
 
-        for dashboard_obj in self.dashboard_objs:
-            for cb in dashboard_obj.filterpanel_values_callbacks:
-                self.callbacks.append(Callback(**cb))
+        for cb in family_callbacks():
+            self.callbacks.append(Callback(**cb))
         for dashboard_obj in self.dashboard_objs:
             for cb in dashboard_obj.windows_callbacks:
                 self.callbacks.append(Callback(**cb))
-        for dashboard_obj in self.dashboard_objs:
-            for filter_obj in dashboard_obj.filter_objs.values():
-                if filter_obj.filter_type in ['checkbox', 'interval']:
-                    self.callbacks.append(Callback(**filter_obj.filter_sync))
         for dashboard_obj in self.dashboard_objs:
             for window_obj in dashboard_obj.window_objs.values():
                 for cb in window_obj.callbacks:
@@ -0,0 +1,97 @@
+from functools import wraps
+import numpy as np
+import pandas as pd
+from dash import callback_context as ctx
+from dash.exceptions import PreventUpdate
+from plotly.basedatatypes import BaseFigure
+from .constants import PYRAMID_GRAINS, LOD_MAX_POINTS
+
+
+class TimePyramid:
+    """
+    Multi-resolution time aggregation of a datasource. Every level holds the measure aggregated by the group columns
+    and one time grain (from the finest to the coarsest), sorted by date so that a visible range is found by bisection
+    """
+
+    def __init__(self, dataframe: pd.DataFrame, date_column: str, value_column: str, group_by: list = None,
+                 agg: str = 'sum', grains: list = None):
+        self.date_column = date_column
+        self.value_column = value_column
+        self.group_by = group_by if group_by else []
+        self.agg = agg
+        self.grains = grains if grains else PYRAMID_GRAINS
+
+        dataframe = dataframe[self.group_by + [date_column, value_column]].copy()
+        dataframe[date_column] = pd.to_datetime(dataframe[date_column])
+        self.levels = {grain: self._aggregate(dataframe, grain) for grain in self.grains}
+        self.dates = {grain: level[date_column].values for grain, level in self.levels.items()}
+
+    def _aggregate(self, dataframe: pd.DataFrame, grain: str) -> pd.DataFrame:
+        return (
+            dataframe
+            .groupby(self.group_by + [pd.Grouper(key=self.date_column, freq=grain)])[self.value_column]
+            .agg(self.agg)
+            .reset_index()
+            .sort_values(by=self.date_column, kind='mergesort')
+            .reset_index(drop=True)
+        )
+
+    def _bounds(self, grain: str, x_range: list = None) -> tuple:
+        dates = self.dates[grain]
+        if not x_range:
+            return 0, len(dates)
+        start, end = np.datetime64(pd.Timestamp(x_range[0])), np.datetime64(pd.Timestamp(x_range[1]))
+        return np.searchsorted(dates, start, side='left'), np.searchsorted(dates, end, side='right')
+
+    def select(self, x_range: list = None, max_points: int = LOD_MAX_POINTS) -> tuple:
+        """
+        Returns the finest level whose number of rows inside the visible x range fits into max_points together with
+        the grain of that level. If no level fits, the coarsest one is used
+        """
+        for grain in self.grains:
+            start, end = self._bounds(grain, x_range)
+            if end - start <= max_points or grain == self.grains[-1]:
+                return self.levels[grain].iloc[start:end], grain
+
+
+def x_range_from_relayout(relayout_data: dict) -> list or None:
+    """ Extracts the visible x range from graph relayoutData. None means the whole axis is visible """
+    if not relayout_data or relayout_data.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        return [relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']]
+    if 'xaxis.range' in relayout_data:
+        return list(relayout_data['xaxis.range'])
+    return None
+
+
+def _is_x_change(relayout_data: dict) -> bool:
+    return bool(relayout_data) and any(key.startswith('xaxis.range') or key == 'xaxis.autorange'
+                                       for key in relayout_data.keys())
+
+
+def zoom_aware(func):
+    """
+    Wraps window callback which has graph relayoutData appended as the last input. The function receives the visible
+    x range as x_range keyword argument. Relayout events that don't touch the x axis are ignored
+    """
+
+    @wraps(func)
+    def wrapper(*args):
+        *args, relayout_data = args
+        if ctx.triggered and all(t['prop_id'].endswith('.relayoutData') for t in ctx.triggered) \
+                and not _is_x_change(relayout_data):
+            raise PreventUpdate
+        return func(*args, x_range=x_range_from_relayout(relayout_data))
+
+    return wrapper
+
+
+def keep_zoom(figure, revision: str):
+    """ Keeps user zoom when the figure is replaced with data of another resolution """
+    if isinstance(figure, BaseFigure):
+        if figure.layout.uirevision is None:
+            figure.update_layout(uirevision=revision)
+    elif isinstance(figure, dict):
+        figure['layout'] = {'uirevision': revision, **figure.get('layout', {})}
+    return figure
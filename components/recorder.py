@@ -0,0 +1,87 @@
+import json
+from functools import wraps
+from hashlib import sha1
+from os import environ, getpid, makedirs
+from os.path import dirname
+from random import random
+from threading import Lock
+from time import time, perf_counter
+import flask
+from .constants import RECORDER_PATH_ENV, RECORDER_SAMPLE_ENV
+
+
+class Recorder:
+    """
+    Append-only log of sampled callback invocations. Every line is a compact JSON object holding the request body
+    of the invocation (inputs, states, triggers), its duration and the hash of the response, so the same traffic can
+    be replayed offline. Each process writes into its own file, so gunicorn workers never interleave lines. The file
+    of the process is opened with the first record, and opened again in a process forked after that
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.):
+        self.path_template = path
+        self.sample_rate = sample_rate
+        self._lock = Lock()
+        self._file = None
+        self._pid = None
+
+    @property
+    def path(self) -> str:
+        template = self.path_template
+        return template.format(pid=getpid()) if '{pid}' in template else f'{template}.{getpid()}'
+
+    def write(self, record: dict) -> None:
+        line = json.dumps(record, separators=(',', ':'), default=str) + '\n'
+        with self._lock:
+            if self._pid != getpid():
+                path = self.path
+                if dirname(path):
+                    makedirs(dirname(path), exist_ok=True)
+                self._file = open(path, 'a', buffering=1)
+                self._pid = getpid()
+            self._file.write(line)
+
+
+def recorder_settings() -> tuple:
+    return environ.get(RECORDER_PATH_ENV), float(environ.get(RECORDER_SAMPLE_ENV, 1.))
+
+
+_recorder = None
+
+
+def record(func, callback_obj):
+    """
+    Callback middleware marking sampled invocations to be written into the log once the response is ready,
+    so the recorded time includes the serialization of the outputs as the replayed one does
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _recorder is None or not flask.has_request_context() or random() >= _recorder.sample_rate:
+            return func(*args, **kwargs)
+        flask.g.record = {'output': callback_obj.output_id, 'start': perf_counter()}
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def init_recorder(server) -> None:
+    """ Creates the process recorder from the environment settings and adds the response hook to the server """
+    global _recorder
+    path, sample_rate = recorder_settings()
+    _recorder = Recorder(path, sample_rate)
+
+    @server.after_request
+    def write_record(response):
+        invocation = flask.g.get('record')
+        if invocation is not None and not response.is_streamed:
+            body = flask.request.get_json(silent=True) or {}
+            _recorder.write({
+                'time': time(),
+                'output': invocation['output'],
+                'seconds': perf_counter() - invocation['start'],
+                'status': response.status_code,
+                'response_sha1': sha1(response.get_data()).hexdigest(),
+                'body': {k: body.get(k) for k in ['output', 'outputs', 'inputs', 'state', 'changedPropIds']},
+            })
+        return response
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+
+class Relationship:
+    """
+    Foreign key from a fact datasource to a dimension datasource. The position of the dimension row of every fact row
+    is computed once per version of both datasources, so a dimension filter becomes a mask gathered by position and
+    dimension columns are gathered the same way instead of merging the frames on every request
+    """
+
+    def __init__(self, fact, dimension, on: str, key: str = None):
+        self.fact = fact
+        self.dimension = dimension
+        self.on = on
+        self.key = key if key else on
+        self._positions = (None, None)
+
+    def positions(self) -> np.ndarray:
+        """ Dimension row position of every fact row, -1 for the fact rows without a dimension row """
+        version = (self.fact.version, self.dimension.version)
+        cached_version, positions = self._positions
+        if cached_version != version:
+            keys = pd.Index(self.dimension.dataframe[self.key])
+            if not keys.is_unique:
+                raise ValueError(f'''
+                    Column {self.key} of datasource {self.dimension.id} has duplicated values.
+                    The key of a dimension datasource should identify its rows.
+                ''')
+            positions = keys.get_indexer(self.fact.dataframe[self.on])
+            self._positions = (version, positions)
+        return positions
+
+    def mask(self, dimension_mask: np.ndarray = None) -> np.ndarray:
+        """ Fact rows whose dimension row exists and passes the dimension mask """
+        positions = self.positions()
+        found = positions >= 0
+        if dimension_mask is None:
+            return found
+        return found & np.asarray(dimension_mask)[np.where(found, positions, 0)]
+
+    def gather(self, column: str, fact_rows: np.ndarray = None) -> np.ndarray:
+        """ Dimension column values of the fact rows (a mask or positions), the rows must have a dimension row """
+        positions = self.positions() if fact_rows is None else self.positions()[fact_rows]
+        return self.dimension.dataframe[column].to_numpy()[positions]
@@ -0,0 +1,97 @@
+"""
+Snapshot of the assembled app structure. It keeps the navigation, the page layouts, the dependency specs of the
+dashboard callbacks and the datasource files the dashboards were built from. A worker booting from the snapshot
+doesn't import any dashboard: the layouts are served from the snapshot and a dashboard module is imported only to
+bind its callback functions when the first of them is called.
+
+    python -m components.snapshot snapshot.pkl
+"""
+import argparse
+import pickle
+import sys
+from importlib import import_module
+from os import walk, replace, getpid
+from os.path import dirname, join, abspath, getmtime, exists
+from .callback import Callback
+from .structure import Structure
+from .datasource import file_version
+
+SNAPSHOT_FORMAT = 1
+
+
+def source_files(projects_path: str) -> dict:
+    """ Modification times of the python files of the projects and of the components package """
+    sources = {}
+    for directory in [projects_path, dirname(abspath(__file__))]:
+        for root, _, files in walk(directory):
+            for file in files:
+                if file.endswith('.py'):
+                    sources[join(root, file)] = getmtime(join(root, file))
+    return sources
+
+
+def build_snapshot(app_obj) -> dict:
+    """ Collects the snapshot from the app assembled in full mode """
+    pages, callbacks, datasources = {}, [], {}
+    for url, dashboard_obj in app_obj.structure_obj.dashboards.items():
+        pages[url] = pickle.dumps([dashboard_obj.overview_modal, dashboard_obj.dashboard_div,
+                                   dashboard_obj.filterpanel_comp])
+        callbacks.extend(Callback.spec(**cb) for cb in Structure.dashboard_callbacks(dashboard_obj))
+        for datasource_obj in dashboard_obj.datasource_objs.values():
+            datasources[datasource_obj.path] = datasource_obj.version
+    return {
+        'format': SNAPSHOT_FORMAT,
+        'projects': list(app_obj.projects_to_get),
+        'sources': source_files(app_obj.projects_path),
+        'datasources': datasources,
+        'navigation': {project_id: project_obj.navigation for project_id, project_obj in app_obj.project_objs.items()},
+        'pages': pages,
+        'callbacks': callbacks,
+    }
+
+
+def write_snapshot(path: str, snapshot: dict) -> None:
+    """ Writes through a temporary file, so workers booting at the same time never read a partial snapshot """
+    temporary_path = f'{path}.{getpid()}.tmp'
+    with open(temporary_path, 'wb') as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    replace(temporary_path, path)
+
+
+def load_snapshot(path: str, projects_path: str, projects_to_get: list) -> dict or None:
+    """ Returns the snapshot if it exists and was built from the current sources and datasources, otherwise None """
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+    if snapshot.get('format') != SNAPSHOT_FORMAT or snapshot['projects'] != list(projects_to_get):
+        return None
+    if snapshot['sources'] != source_files(projects_path):
+        return None
+    for datasource_path, version in snapshot['datasources'].items():
+        if not exists(datasource_path) or file_version(datasource_path) != version:
+            return None
+    return snapshot
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='snapshot file the app is configured with')
+    parser.add_argument('--app-dir', default='.', help='directory of the app module')
+    args = parser.parse_args(argv)
+
+    if exists(args.path):
+        replace(args.path, f'{args.path}.old')
+    sys.path.insert(0, abspath(args.app_dir))
+    # Assembling the app writes the snapshot it's configured with
+    import_module('app')
+    if not exists(args.path):
+        print(f"The app isn't configured with the snapshot {args.path}")
+        return 1
+    print(f'Snapshot written to {args.path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from threading import Lock
+from uuid import uuid4
+from .constants import SERVER_STORE_SIZE
+
+
+class LRUCache:
+    def __init__(self, max_items: int, on_evict=None):
+        self.max_items = max_items
+        self.on_evict = on_evict
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key, value) -> None:
+        evicted = []
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                evicted.append(self._items.popitem(last=False))
+        if self.on_evict:
+            for evicted_key, evicted_value in evicted:
+                self.on_evict(evicted_key, evicted_value)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+
+class ServerStore(LRUCache):
+    """
+    Keeps callback results on the server side. The browser only receives a short key which is later resolved back
+    to the data. The cache is local to the process and bounded, so a key may expire and resolve to None
+    """
+
+    def put(self, value) -> str:
+        key = uuid4().hex[:16]
+        self.set(key, value)
+        return key
+
+
+server_store = ServerStore(SERVER_STORE_SIZE)
@@ -3,6 +3,7 @@ import dash_bootstrap_components as dbc
 from .navbar import NavBar
 from .home import Home
 from .callback import Callback
+from .families import family_callbacks
 try:
     from typing import Literal
 except ImportError:
@@ -12,15 +13,25 @@ except ImportError:
 class Structure:
     def __init__(self, mode: Literal['full', 'project', 'dashboard'] = 'full', project_objs: dict = None,
                  dashboard_objs: dict = None, overview_modal=None, filterpanel_comp=None, dashboard_div=None,
-                 callbacks: list = None):
+                 callbacks: list = None, loader=None, middlewares: list = None):
         self.url = dcc.Location(id="url", refresh=False)
         self.mode = mode
         self.project_objs = project_objs
         self.dashboard_objs = dashboard_objs
+        self.loader = loader
+        self.middlewares = middlewares if middlewares else []
+        if self.mode == 'full':
+            self.dashboards = {
+                dashboard_obj.url: dashboard_obj
+                for project_obj in self.project_objs.values() for dashboard_obj in project_obj.dashboard_objs.values()
+            }
+        elif self.mode == 'project':
+            self.dashboards = {dashboard_obj.url: dashboard_obj for dashboard_obj in self.dashboard_objs.values()}
         if self.mode in ['full', 'project']:
             self._get_navigation_dict()
             self.home_obj = Home(navigation=self.navigation, mode=self.mode)
-            self.navbar_obj = NavBar(navigation=self.navigation, mode=self.mode)
+            self.navbar_obj = NavBar(navigation=self.navigation, mode=self.mode,
+                                     external_links=loader is not None and not loader.preregistered)
         else:
             self.navbar_obj = NavBar(mode=self.mode)
         self.layout = self._set_layout(overview_modal=overview_modal, filterpanel_comp=filterpanel_comp,
@@ -61,10 +72,7 @@ class Structure:
             self.navigation = {
                 project_id: {
                     'name': project_obj.name,
-                    'dashboards': {
-                        dashboard_obj.url: dashboard_obj.name
-                        for dashboard_obj in project_obj.dashboard_objs.values()
-                    }
+                    'dashboards': project_obj.navigation
                 }
                 for project_id, project_obj in self.project_objs.items()
             }
@@ -107,20 +115,25 @@ class Structure:
             (self.navbar_obj.nav.id, 'style'),
             (self.page_content_div, 'style')
         ]
+        self.render_page_outputs = output_list
 
         roots = {
-            dashboard_obj.url: [
+            url: [
                 dashboard_obj.overview_modal,
                 dashboard_obj.dashboard_div,
                 dashboard_obj.filterpanel_comp,
                 {},
                 {},
             ]
-            for project_obj in self.project_objs.values() for dashboard_obj in project_obj.dashboard_objs.values()
+            for url, dashboard_obj in self.dashboards.items()
         }
         roots[self.home_obj.url] = [[], self.home_obj.layout, [], {'display': 'none'}, {'margin': '0'}]
 
         def render_page(url):
+            if url not in roots and self.loader is not None:
+                page = self.loader.page(url)
+                if page is not None:
+                    return page + [{}, {}]
             return roots[url]
 
         return {
@@ -129,8 +142,34 @@ class Structure:
             'func': render_page
         }
 
+    def get_dashboard(self, url: str):
+        """ Dashboard object of the url, None for the urls that aren't dashboards """
+        if self.loader is not None:
+            return self.loader.get(url)
+        return self.dashboards.get(url)
+
+    @staticmethod
+    def dashboard_callbacks(dashboard_obj) -> list:
+        """ Collects dashboard callbacks labeling them with the dashboard and the window they belong to """
+        callbacks = list(dashboard_obj.windows_callbacks)
+        for window_obj in dashboard_obj.window_objs.values():
+            callbacks.extend(window_obj.callbacks)
+        for filter_obj in dashboard_obj.filter_objs.values():
+            callbacks.extend(filter_obj.callbacks)
+
+        labeled_callbacks = []
+        for cb in callbacks:
+            output_id = cb['outputs'][0][0]
+            if isinstance(output_id, dict):
+                window = str(output_id.get('window', ''))
+            else:
+                window = output_id.replace(f'{dashboard_obj.id_prefix}-', '', 1).split('-')[0]
+            labels = {'dashboard': dashboard_obj.id_prefix, 'window': window if window.isdigit() else ''}
+            labeled_callbacks.append({**cb, 'labels': labels})
+        return labeled_callbacks
+
     def _collect_callbacks(self, callbacks_passed: list = None) -> None:
-        callbacks = [self._toggle_overview(), self._toggle_filterpanel()]
+        callbacks = [self._toggle_overview(), self._toggle_filterpanel()] + family_callbacks()
         if self.mode in ['full', 'project']:
             callbacks.append(self._render_page())
             callbacks.extend(self.navbar_obj.callbacks)
@@ -139,17 +178,11 @@ class Structure:
             callbacks.extend(self.home_obj.callbacks)
             for project_obj in self.project_objs.values():
                 for dashboard_obj in project_obj.dashboard_objs.values():
-                    callbacks.extend(dashboard_obj.windows_callbacks + dashboard_obj.filterpanel_values_callbacks)
-                    for window_obj in dashboard_obj.window_objs.values():
-                        callbacks.extend(window_obj.callbacks)
-                    for filter_obj in dashboard_obj.filter_objs.values():
-                        callbacks.extend(filter_obj.callbacks)
+                    callbacks.extend(self.dashboard_callbacks(dashboard_obj))
         elif self.mode == 'project':
             for dashboard_obj in self.dashboard_objs.values():
-                callbacks.extend(dashboard_obj.windows_callbacks + dashboard_obj.filterpanel_values_callbacks)
-                for filter_obj in dashboard_obj.filter_objs.values():
-                    callbacks.append(filter_obj.callback)
+                callbacks.extend(self.dashboard_callbacks(dashboard_obj))
         else:
             callbacks.extend(callbacks_passed)
         
-        self.callbacks = [Callback(**d) for d in callbacks if d is not None]
+        self.callbacks = [Callback(**d, middlewares=self.middlewares) for d in callbacks if d is not None]
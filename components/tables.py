@@ -0,0 +1,84 @@
+"""
+DataFrame to DataTable conversion. The values are taken out of the frame with tolist by dtype blocks, so numpy
+scalars become python ones in C instead of a per cell conversion of an object array. A table window sends the rows
+either as DataTable records or as a columnar payload {'columns': ids, 'values': [values of every column]} which the
+browser turns into records (tables.rows in assets/tables.js)
+"""
+from collections import defaultdict
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from dash.exceptions import PreventUpdate
+
+
+def column_ids(columns: pd.Index) -> list:
+    """ Column ids, the levels of MultiIndex columns are joined skipping the empty ones """
+    if isinstance(columns, pd.MultiIndex):
+        return [''.join(str(level) for level in column if level) for column in columns]
+    return [str(column) for column in columns]
+
+
+def table_columns(df: pd.DataFrame) -> list:
+    """ DataTable columns, MultiIndex columns get a header row for every level """
+    names = [list(column) if isinstance(column, tuple) else column for column in df.columns]
+    return [{'name': name, 'id': column_id} for name, column_id in zip(names, column_ids(df.columns))]
+
+
+def column_values(df: pd.DataFrame) -> list:
+    """
+    Values of every column as a list of python scalars. Numeric columns of the same dtype are converted as one block,
+    missing values stay NaN and are sent as null like before
+    """
+    values = [None] * df.shape[1]
+    blocks = defaultdict(list)
+    for position, dtype in enumerate(df.dtypes):
+        if is_numeric_dtype(dtype):
+            blocks[dtype].append(position)
+        else:
+            values[position] = df.iloc[:, position].tolist()
+    for positions in blocks.values():
+        for position, column in zip(positions, df.iloc[:, positions].to_numpy().T.tolist()):
+            values[position] = column
+    return values
+
+
+def to_datatable(df: pd.DataFrame) -> tuple:
+    """ DataTable columns and records of the frame """
+    ids = column_ids(df.columns)
+    return table_columns(df), [dict(zip(ids, row)) for row in zip(*column_values(df))]
+
+
+def payload_rows(payload: dict) -> list:
+    """ tables.rows of assets/tables.js, the records of the columnar payload """
+    if not payload:
+        raise PreventUpdate
+    return [dict(zip(payload['columns'], row)) for row in zip(*payload['values'])]
+
+
+def selected_keys(selected_rows: list, data: list, selection: dict) -> dict:
+    """ tables.selection of assets/tables.js, the key values of the selected rows """
+    if not data or not selection:
+        raise PreventUpdate
+    key = selection['key']
+    return {'key': key, 'keys': [data[row][key] for row in selected_rows or [] if row < len(data)]}
+
+
+def selection_query(selection: dict) -> str:
+    """ Query expression of the rows whose key is selected """
+    return f"`{selection['key']}` in {selection.get('keys', [])}"
+
+
+def table_data(data, columnar: bool = False):
+    """
+    Output hook of the table data. Converts a DataFrame to records or to the columnar payload, records are converted
+    to the columnar payload too, so window functions returning records keep working with the columnar transport
+    """
+    if isinstance(data, pd.DataFrame):
+        ids, values = column_ids(data.columns), column_values(data)
+    elif columnar and isinstance(data, list):
+        ids = list(data[0].keys()) if data else []
+        values = [[row.get(column_id) for row in data] for column_id in ids]
+    else:
+        return data
+    if columnar:
+        return {'columns': ids, 'values': values}
+    return [dict(zip(ids, row)) for row in zip(*values)]
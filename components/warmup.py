@@ -0,0 +1,226 @@
+"""
+Startup warm-up. The window callbacks of every dashboard are run once in dependency order with the filter panel
+state built from the default values of the filters and parameters, the way the first page load calls them. Their
+results are kept in the result cache, the window callbacks called with the same inputs are answered from it, and the
+datasource structures built on first use (cubes, pyramids, relationship positions) are built along the way.
+The readiness route answers 503 until the warm-up of the process is done.
+"""
+import json
+from functools import wraps
+from os import getpid
+from threading import Thread, Event, Lock
+from time import perf_counter
+import flask
+from dash import ClientsideFunction
+from dash.development.base_component import Component
+from dash._callback import NoUpdate
+from dash.exceptions import PreventUpdate
+from plotly.utils import PlotlyJSONEncoder
+from .callback import Callback
+from .structure import Structure
+from .funcs import family_id, content_hash
+from .store import LRUCache
+from .tables import payload_rows, selected_keys
+from .clientside import filter_rows, rows_table
+from .constants import READY_ROUTE, WARMUP_RESULTS_SIZE
+
+# Python counterparts of the clientside functions, the callbacks of the other ones are skipped
+CLIENTSIDE_FUNCTIONS = {
+    ('tables', 'rows'): payload_rows, ('tables', 'selection'): selected_keys,
+    ('datasources', 'filter'): filter_rows, ('datasources', 'table'): rows_table
+}
+
+results = LRUCache(WARMUP_RESULTS_SIZE)
+_warm_outputs = set()
+
+
+def _normalized(value):
+    """ The value as the browser sends it back, after the JSON round trip """
+    return json.loads(json.dumps(value, cls=PlotlyJSONEncoder))
+
+
+def _prop_id(component_id, prop: str) -> str:
+    if isinstance(component_id, dict):
+        component_id = json.dumps(component_id, sort_keys=True, separators=(',', ':'))
+    return f'{component_id}.{prop}'
+
+
+def serve_warm(func, callback_obj):
+    """ Callback middleware answering the window callbacks called with the warmed inputs from the result cache """
+    if not callback_obj.labels['window']:
+        return func
+    output_id = callback_obj.output_id
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if output_id in _warm_outputs and not kwargs:
+            result = results.get((output_id, content_hash(args)))
+            if result is not None:
+                return result
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def _layout_props(component, props: dict) -> dict:
+    """ Properties of the components with ids as they are set in the layout, before any callback has run """
+    if isinstance(component, (list, tuple)):
+        for child in component:
+            _layout_props(child, props)
+    elif isinstance(component, Component):
+        component_props = component.to_plotly_json()['props']
+        if 'id' in component_props:
+            for prop, value in component_props.items():
+                if prop not in ('id', 'children'):
+                    props[_prop_id(component_props['id'], prop)] = value
+        _layout_props(getattr(component, 'children', None), props)
+    return props
+
+
+def _cacheable(dashboard_obj, cb: dict) -> bool:
+    """ Server table store keys may expire, so the callbacks writing them are run but never answered from the cache """
+    return not any(
+        isinstance(component_id, dict) and component_id.get('type') == 'table_store'
+        and dashboard_obj.window_objs[component_id['window']].table_store == 'server'
+        for component_id, _ in cb['outputs']
+    )
+
+
+def _run(server, cb: dict, values: dict, layout: dict):
+    dependencies = cb['inputs'] + (cb.get('states') or [])
+    args = [
+        values[_prop_id(*dependency)] if _prop_id(*dependency) in values
+        else _normalized(layout.get(_prop_id(*dependency)))
+        for dependency in dependencies
+    ]
+    if isinstance(cb['func'], ClientsideFunction):
+        function = CLIENTSIDE_FUNCTIONS.get((cb['func'].namespace, cb['func'].function_name))
+        return args, function(*args) if function else None
+    inputs = [
+        {'id': component_id, 'property': prop, 'value': value}
+        for (component_id, prop), value in zip(cb['inputs'], args)
+    ]
+    with server.test_request_context():
+        flask.g.inputs_list = inputs
+        flask.g.states_list = [
+            {'id': component_id, 'property': prop, 'value': value}
+            for (component_id, prop), value in zip(cb.get('states') or [], args[len(inputs):])
+        ]
+        outputs = [{'id': component_id, 'property': prop} for component_id, prop in cb['outputs']]
+        flask.g.outputs_list = outputs if len(outputs) > 1 else outputs[0]
+        flask.g.triggered_inputs = [
+            {'prop_id': _prop_id(i['id'], i['property']), 'value': i['value']}
+            for i in inputs if _prop_id(i['id'], i['property']) in values
+        ]
+        return args, cb['func'](*args)
+
+
+def warm_dashboard(server, dashboard_obj) -> list:
+    """
+    Runs the window callbacks of the dashboard from the default filter panel state. A callback runs once none of
+    its inputs and states is an output of the callbacks still pending, and only if one of its inputs got a value or
+    it's called initially, as in the browser. The other properties have their layout values. Returns the errors of
+    the callbacks that failed
+    """
+    states = dashboard_obj.default_filterpanel_states()
+    values = {
+        _prop_id(family_id('filterpanel_values_store', dashboard_obj.id_prefix, window=window_id), 'data'):
+            _normalized(dashboard_obj.filterpanel_state(states, window_id))
+        for window_id in dashboard_obj.window_objs.keys()
+    }
+    layout = _layout_props(dashboard_obj.dashboard_div, {})
+    pending = [cb for cb in Structure.dashboard_callbacks(dashboard_obj) if cb['labels']['window']]
+    errors = []
+    while pending:
+        produced = {_prop_id(*output) for cb in pending for output in cb['outputs']}
+        waiting = [
+            cb for cb in pending
+            if any(_prop_id(*dependency) in produced - {_prop_id(*output) for output in cb['outputs']}
+                   for dependency in cb['inputs'] + (cb.get('states') or []))
+        ]
+        runnable = [cb for cb in pending if cb not in waiting] or pending[:1]
+        for cb in runnable:
+            pending.remove(cb)
+            triggered = any(_prop_id(*dependency) in values for dependency in cb['inputs'])
+            if not triggered and cb.get('initial_call') is not True:
+                continue
+            try:
+                args, result = _run(server, cb, values, layout)
+            except PreventUpdate:
+                continue
+            except Exception as error:
+                errors.append(f"{Callback.spec(cb['outputs'], cb['inputs'])['output']}: {error!r}")
+                continue
+            if result is None and isinstance(cb['func'], ClientsideFunction):
+                continue
+            result = _normalized(result)
+            for (component_id, prop), value in zip(cb['outputs'], [result] if len(cb['outputs']) == 1 else result):
+                if not isinstance(value, NoUpdate):
+                    values[_prop_id(component_id, prop)] = value
+            if not isinstance(cb['func'], ClientsideFunction) and _cacheable(dashboard_obj, cb):
+                output_id = Callback.spec(cb['outputs'], cb['inputs'])['output']
+                results.set((output_id, content_hash(args)), result)
+                _warm_outputs.add(output_id)
+    return errors
+
+
+class WarmUp:
+    """
+    Warm-up of the dashboards of the app on a background thread. A process forked from the one that started it
+    (gunicorn --preload) starts its own warm-up on its first request, unless it was forked after the warm-up was done
+    """
+
+    def __init__(self, server, structure_obj):
+        self.server = server
+        self.structure_obj = structure_obj
+        self.ready = Event()
+        self.pid = None
+        self.warmed = 0
+        self.errors = []
+        self.seconds = None
+        self._lock = Lock()
+
+    def urls(self) -> list:
+        loader = self.structure_obj.loader
+        return list(loader.routes.keys()) if loader is not None else list(self.structure_obj.dashboards.keys())
+
+    def start(self) -> None:
+        with self._lock:
+            if self.pid == getpid() or self.ready.is_set():
+                return
+            self.pid = getpid()
+        Thread(target=self.run, name='warmup', daemon=True).start()
+
+    def run(self) -> None:
+        start = perf_counter()
+        for url in self.urls():
+            try:
+                dashboard_obj = self.structure_obj.get_dashboard(url)
+                self.errors.extend(f'{url} {error}' for error in warm_dashboard(self.server, dashboard_obj))
+            except Exception as error:
+                self.errors.append(f'{url}: {error!r}')
+            self.warmed += 1
+        self.seconds = perf_counter() - start
+        self.ready.set()
+
+    def status(self) -> dict:
+        return {'ready': self.ready.is_set(), 'warmed': self.warmed, 'dashboards': len(self.urls()),
+                'seconds': self.seconds, 'errors': self.errors}
+
+
+def init_warmup(server, structure_obj, warmup: bool = True):
+    """ Adds the readiness route, without the warm-up the app is ready right away """
+    warmup_obj = WarmUp(server, structure_obj)
+    if warmup:
+        server.before_request(warmup_obj.start)
+        warmup_obj.start()
+    else:
+        warmup_obj.ready.set()
+
+    def ready_view():
+        status = warmup_obj.status()
+        return flask.Response(json.dumps(status), status=200 if status['ready'] else 503,
+                              mimetype='application/json')
+
+    server.add_url_rule(READY_ROUTE, 'ready', ready_view)
+    return warmup_obj
@@ -1,9 +1,14 @@
-from dash import dcc, html, dash_table
+from functools import partial
+from dash import dcc, html, dash_table, ClientsideFunction
 import dash_bootstrap_components as dbc
 from dash_iconify import DashIconify
 import plotly.graph_objects as go
-from .constants import EMPTY_LAYOUT, MODEBAR_BUTTONS, META_BUTTONS, TABLE_STYLE_CELL, TABLE_STYLE_HEADER
-from .funcs import merge_children
+from .constants import EMPTY_LAYOUT, MODEBAR_BUTTONS, META_BUTTONS, LOD_MAX_POINTS
+from .funcs import merge_children, chain, family_id
+from .store import server_store
+from .downsampling import reduce_figure
+from .pyramid import keep_zoom
+from .tables import table_data
 try:
     from typing import Litera
 except ImportError:
@@ -13,15 +18,28 @@ except ImportError:
 class Window:
     def __init__(self, dashboard_id: str, window_id: int, name: str, row_start: int, row_end: int, col_start: int,
                  col_end: int, remove_buttons: list = None, layout: dict = None, info: str = None,
-                 table_feature: bool = False, content_type: Literal['graph', 'table'] = 'graph'):
+                 table_feature: bool = False, content_type: Literal['graph', 'table', 'pivot'] = 'graph',
+                 table_store: Literal['client', 'server'] = 'client', max_points: int = LOD_MAX_POINTS,
+                 webgl: bool = True, drop_text: bool = True, zoom_lod: bool = False,
+                 table_transport: Literal['records', 'columnar'] = 'records', pivot: dict = None,
+                 export: dict = None, selection_key: str = None, clientside: str = None):
         self.dashboard_id = dashboard_id
         self.id = window_id
         self.name = name
         self.info_text = 'Graph info is WIP.' if not info else info
         self.table_feature = table_feature
-        self.buttons = []
-        self.features = []
-        self.callbacks = []
+        self.table_store = table_store
+        self.max_points = max_points
+        self.webgl = webgl
+        self.drop_text = drop_text
+        self.zoom_lod = zoom_lod
+        self.table_transport = table_transport
+        self.pivot = pivot
+        self.export = export
+        self.selection_key = selection_key
+        self.clientside = clientside
+        self.clientside_parameters = {}
+        self.content_type = content_type
         self.layout = EMPTY_LAYOUT if not layout else layout
         self.remove_buttons = remove_buttons if remove_buttons else []
         self.window_config = {
@@ -32,23 +50,14 @@ class Window:
         }
 
         self._set_id_prefix()
-        self._label()
-
-        self.content_type = content_type
-        if self.content_type == 'graph':
-            self._graph()
-        else:
-            self._table()
-
-        self._filterpanel_values()
-        self._info()
-        if self.table_feature:
-            self._meta_table()
-        self._create_window()
 
     def _set_id_prefix(self, project_id: str = None):
         dash_window = f"{self.dashboard_id}-{self.id}"
         self.id_prefix = dash_window if not project_id else f"{project_id}-{dash_window}"
+        self.dashboard_prefix = self.dashboard_id if not project_id else f"{project_id}-{self.dashboard_id}"
+
+    def _dict_id(self, component_type: str) -> dict:
+        return family_id(component_type, self.dashboard_prefix, window=self.id)
 
     @staticmethod
     def _validate_modebar_buttons(buttons) -> bool:
@@ -74,6 +83,13 @@ class Window:
             responsive=True,
             className='graph'
         )
+        hooks = []
+        if self.zoom_lod:
+            hooks.append(partial(keep_zoom, revision=self.graph_id))
+        if self.max_points:
+            hooks.append(partial(reduce_figure, max_points=self.max_points, webgl=self.webgl, drop_text=self.drop_text))
+        if hooks:
+            self.output_hooks['graph.figure'] = chain(*hooks)
 
     def _table(self) -> None:
         self.graph_id = f"{self.id_prefix}-table"
@@ -104,9 +120,68 @@ class Window:
             ),
             className='graph'
         )
+        self._table_transport()
+        if self.selection_key:
+            self._selection()
+
+    def _table_transport(self) -> None:
+        """
+        The table data output goes through the table_data hook, so window functions can return a DataFrame. With the
+        columnar transport the data is sent to a store as columns and the browser rebuilds the records of the table
+        """
+        columnar = self.table_transport == 'columnar'
+        self.output_hooks['table.data'] = partial(table_data, columnar=columnar)
+        if columnar:
+            self.table_payload_id = f"{self.id_prefix}-table_payload"
+            self.features.append(dcc.Store(id=self.table_payload_id))
+            self.output_targets['table.data'] = 'table_payload.data'
+            self.callbacks.append(
+                {
+                    'outputs': [(self.graph_id, 'data')],
+                    'inputs': [(self.table_payload_id, 'data')],
+                    'func': ClientsideFunction('tables', 'rows')
+                }
+            )
+
+    def _selection(self) -> None:
+        """
+        The keys of the selected rows are published into the selection store by the browser, so the windows depending
+        on the selection get {'key': column, 'keys': [values]} instead of the table data and the selected row numbers
+        """
+        self.selection_id = f"{self.id_prefix}-selection"
+        self.features.append(dcc.Store(id=self.selection_id, data={'key': self.selection_key}))
+        self.callbacks.append(
+            {
+                'outputs': [(self.selection_id, 'data')],
+                'inputs': [(self.graph_id, 'selected_rows'), (self.graph_id, 'data')],
+                'states': [(self.selection_id, 'data')],
+                'func': ClientsideFunction('tables', 'selection')
+            }
+        )
+
+    def _clientside(self) -> None:
+        """
+        The browser puts the rows of the clientside datasource passing the filters of the window into the rows store.
+        The store starts with the config of the filtering: the datasource and the predicates of the parameter options
+        """
+        self.rows_id = f"{self.id_prefix}-rows"
+        self.features.append(
+            dcc.Store(id=self.rows_id, data={'datasource': self.clientside, 'parameters': self.clientside_parameters})
+        )
+        self.callbacks.append(
+            {
+                'outputs': [(self.rows_id, 'data')],
+                'inputs': [
+                    (self.filterpanel_values_store_id, 'data'),
+                    (family_id('datasource_store', self.dashboard_prefix, datasource=self.clientside), 'data')
+                ],
+                'states': [(self.rows_id, 'data')],
+                'func': ClientsideFunction('datasources', 'filter')
+            }
+        )
 
     def _filterpanel_values(self):
-        self.filterpanel_values_store_id = f"{self.id_prefix}-filterpanel_values_store"
+        self.filterpanel_values_store_id = self._dict_id('filterpanel_values_store')
         self.filterpanel_values_store_comp = dcc.Store(id=self.filterpanel_values_store_id)
 
     def _info(self) -> None:
@@ -126,9 +201,9 @@ class Window:
         self.features.append(self.info_popover_comp)
 
     def _meta_table(self) -> None:
-        self.table_modal_id = f"{self.id_prefix}-table_modal"
-        self.table_button_id = f"{self.id_prefix}-table_button"
-        self.table_store_id = f"{self.id_prefix}-table_store"
+        self.table_modal_id = self._dict_id('table_modal')
+        self.table_button_id = self._dict_id('table_button')
+        self.table_store_id = self._dict_id('table_store')
         self.table_button_comp = html.Button(
             DashIconify(icon=META_BUTTONS['data_table'], width=30),
             id=self.table_button_id,
@@ -144,20 +219,20 @@ class Window:
         self.features.append(self.table_store_comp)
         self.features.append(self.table_modal_comp)
 
-        def table_show(nclicks, data):
-            if data:
-                table = dash_table.DataTable(data['table'], style_cell=TABLE_STYLE_CELL, style_header=TABLE_STYLE_HEADER)
-                return True, table
-            else:
-                return True, html.P("No data yet")
-        self.callbacks.append(
-            {
-                'outputs': [(self.table_modal_id, 'is_open'), (self.table_modal_id, 'children')],
-                'inputs': [(self.table_button_id, 'n_clicks')],
-                'states': [(self.table_store_id, 'data')],
-                'func': table_show
-            }
+        if self.table_store == 'server':
+            # The store keeps only a key, the table modal resolves the table from the server store and pages it there
+            self.output_hooks['table_store.data'] = server_store.put
+
+    def _export(self) -> None:
+        # The link is set by the export link callback family when the filter panel state of the window is propagated
+        self.export_link_id = self._dict_id('export_link')
+        self.export_link_comp = html.A(
+            DashIconify(icon=META_BUTTONS['export'], width=30),
+            id=self.export_link_id,
+            target='_blank',
+            className='little-button'
         )
+        self.buttons.append(self.export_link_comp)
 
     def _create_window(self):
         self.window_comp_id = f"{self.id_prefix}-window"
@@ -182,11 +257,17 @@ class Window:
             className='window',
         )
 
-    def update_ids(self, project_id) -> None:
+    def build(self, project_id: str = None) -> None:
+        """
+        Builds the window components, their callbacks and output hooks with the final ids. The dashboard calls it once
+        when it's finalized, the window only records its settings until then
+        """
         self._set_id_prefix(project_id)
         self.buttons = []
         self.features = []
         self.callbacks = []
+        self.output_hooks = {}
+        self.output_targets = {}
 
         self._label()
 
@@ -198,7 +279,13 @@ class Window:
         self._filterpanel_values()
         self._info()
 
+        if self.clientside:
+            self._clientside()
+
         if self.table_feature:
             self._meta_table()
 
+        if self.export:
+            self._export()
+
         self._create_window()
@@ -7,9 +7,9 @@ from utils.funcs import *
 from utils.constants import *
 
 from components import Dashboard
+from components.tables import table_columns, selection_query
 import pandas as pd
 from numpy import stack
-import calendar
 import plotly.graph_objects as go
 
 
@@ -68,7 +68,10 @@ dashboard.add_window(
     row_end=2,
     col_start=1,
     col_end=2,
-    content_type='table',
+    content_type='pivot',
+    pivot={'datasource': 'Movements', 'rows': 'ID', 'date': 'Date', 'measure': 'Movement', 'agg': 'cumsum'},
+    table_transport='columnar',
+    selection_key='Name',
     info=(
         'Сводная таблица. Значениями является итоговое состояние "баланса" на конец месяца. У каждой строки есть '
         'чекбокс, отмеченный по умолчанию для текущей страницы. Выделенные статьи отрисовываются на остальных графиках'
@@ -98,6 +101,7 @@ dashboard.add_window(
     col_end=4,
     content_type='graph',
     layout={},
+    export={'datasource': 'Movements', 'join': {'Items': ['Name']}, 'parameters': ['negative_positive']},
     info=(
         'Линейный график, на котором, можно отследить динамику изменения баланса по каждой из статей. '
         'В отличие от таблицы, показывающей итог за месяц, здесь зафиксировано каждое изменение, что '
@@ -107,31 +111,12 @@ dashboard.add_window(
 
 
 def window_1(filterpanel_values):
-    print('WINDOW 1')
-    query_expressions = filterpanel_values['query_expressions']
     movement_param = filterpanel_values['parameters']['negative_positive']
-    if movement_param != '':
-        query_expressions['Movements'] += f' & {movement_param}'
+    names = items.dataframe.set_index('ID')['Name']
 
-    movement_df = movements.dataframe.query(query_expressions['Movements'])
-    items_df = items.dataframe.query(query_expressions['Items'])
-    movement_df['Date'] = pd.to_datetime(movement_df.Date, format='%Y-%m-%d')
-    movement_df = (
-        movement_df
-        .sort_values(by=['Date', 'ID'])
-        .groupby(['ID', pd.Grouper(key='Date', freq='1M')])['Movement']
-        .sum()
-        .groupby(level=0)
-        .cumsum()
-        .reset_index()
-    )
-    movement_df[['Year', 'Month']] = movement_df.Date.dt.to_period("M").astype('str').str.split('-', expand=True)
-    movement_df['Month Name'] = movement_df['Month'].apply(lambda x: calendar.month_abbr[int(x)])
-    merged_data = pd.merge(left=movement_df, right=items_df, how='inner', on='ID')
-    pvt = merged_data.pivot_table(index='Name', columns=['Year', 'Month', 'Month Name'], values='Movement')
-    pvt.columns = pvt.columns.droplevel(1)
-    pvt = pvt.reset_index()
-    columns, data = convert_df_to_dash(pvt)
+    pvt = dashboard.pivot(1, filterpanel_values, where=movement_param or None).set_index('ID')
+    pvt.index = pd.Index(names.loc[pvt.index], name='Name')
+    pvt = pvt.sort_index().reset_index()
     selected_rows = [i for i in range(len(pvt))]
     
     style_data_conditional = [
@@ -145,7 +130,7 @@ def window_1(filterpanel_values):
         for name, color in NAME_COLORS.items()
     ]
     
-    return [columns, data, selected_rows, style_data_conditional]
+    return [table_columns(pvt), pvt, selected_rows, style_data_conditional]
 
 
 dashboard.set_callback(
@@ -154,23 +139,22 @@ dashboard.set_callback(
     func=window_1
 )
 
-def window_2(data, rows, filterpanel_values):
-    names = [data[row]['Name'] for row in rows]
-
+def window_2(selection, filterpanel_values):
     query_expressions = filterpanel_values['query_expressions']
     movement_param = filterpanel_values['parameters']['negative_positive']
     if movement_param != '':
         query_expressions['Movements'] += f' & {movement_param}'
 
-    movement_df = movements.dataframe.query(query_expressions['Movements'])
-    items_df = items.dataframe.query(query_expressions['Items'])
-    items_df = items_df.query(f'Name in {names}')
-
-    movement_df = movement_df.groupby(['ID'])['Movement'].agg([('Spendings' , lambda x : (x[x < 0] * -1).sum()) , ('Earnings' , lambda x : x[x > 0].sum())])
-    movement_df = movement_df.unstack().reset_index(name='Amount')
-    movement_df.rename(columns={'level_0': 'Movement Type'}, inplace=True)
+    items_query = ' & '.join(part for part in [query_expressions['Items'], selection_query(selection)] if part)
+    movement_df = movements.select(query_expressions['Movements'], related={'Items': items_query},
+                                   join={'Items': ['Name']})
 
-    merged_grpd = pd.merge(left=movement_df, right=items_df, how='inner', on='ID').sort_values(by='Name')
+    movement_df = movement_df.groupby(['ID', 'Name'])['Movement'].agg([('Spendings' , lambda x : (x[x < 0] * -1).sum()) , ('Earnings' , lambda x : x[x > 0].sum())])
+    merged_grpd = (
+        movement_df.reset_index()
+        .melt(id_vars=['ID', 'Name'], var_name='Movement Type', value_name='Amount')
+        .sort_values(by='Name')
+    )
     
     fig_data = []
     
@@ -227,27 +211,24 @@ def window_2(data, rows, filterpanel_values):
 dashboard.set_callback(
     outputs={2: ['graph.figure']},
     inputs={
-        1: ['table.data', 'table.selected_rows'],
+        1: ['selection.data'],
         2: ['filterpanel_values_store.data']
     },
     func=window_2
 )
     
-def window_3(data, rows, filterpanel_values):
-    names = [data[row]['Name'] for row in rows]
-    
+def window_3(selection, filterpanel_values):
     query_expressions = filterpanel_values['query_expressions']
     movement_param = filterpanel_values['parameters']['negative_positive']
     if movement_param != '':
         query_expressions['Movements'] += f' & {movement_param}'
 
-    movement_df = movements.dataframe.query(query_expressions['Movements'])
-    items_df = items.dataframe.query(query_expressions['Items'])
-    items_df = items_df.query(f'Name in {names}')
-    movement_df['Date'] = pd.to_datetime(movement_df.Date, format='%Y-%m-%d')
-    movement_df['Balance State'] = movement_df.sort_values(by=['Date', 'ID']).groupby(['ID'])['Movement'].cumsum()
-    movement_df['Percent Change'] = round(movement_df.groupby(['ID'])['Balance State'].apply(pd.Series.pct_change) * 100, 1)
-    merged_data = pd.merge(left=movement_df, right=items_df, how='inner', on='ID')
+    items_query = ' & '.join(part for part in [query_expressions['Items'], selection_query(selection)] if part)
+    merged_data = movements.select(query_expressions['Movements'], related={'Items': items_query},
+                                   join={'Items': ['Name']})
+    merged_data['Date'] = pd.to_datetime(merged_data.Date, format='%Y-%m-%d')
+    merged_data['Balance State'] = merged_data.sort_values(by=['Date', 'ID']).groupby(['ID'])['Movement'].cumsum()
+    merged_data['Percent Change'] = round(merged_data.groupby(['ID'])['Balance State'].apply(pd.Series.pct_change) * 100, 1)
     
     fig_data = []
     
@@ -316,7 +297,7 @@ def window_3(data, rows, filterpanel_values):
 dashboard.set_callback(
     outputs={3: ['graph.figure']},
     inputs={
-        1: ['table.data', 'table.selected_rows'],
+        1: ['selection.data'],
         3: ['filterpanel_values_store.data']
     },
     func=window_3
@@ -9,4 +9,6 @@ movements = DataSource(
 
 items = DataSource(
     'Items.csv', sep=';', filter_columns={'Name': 'unique'}
-)
\ No newline at end of file
+)
+
+movements.relate(items, on='ID')
\ No newline at end of file